@@ -0,0 +1,151 @@
+from scipy.special import softmax
+import numpy as np
+from operators.Operators import Operators as Ops
+from operators.SimplexSolver import SimplexSolver
+from environments.MazeModel import MazeModel
+
+
+#
+# This class emulates N independent CFE agents at once. The posteriors of all agents are stored in stacked
+# arrays, e.g. b_hat has shape [N, T, S, A], and each update is performed for the whole batch at once. During
+# inference, the agents whose CFE has already converged are masked out, so that they are not updated anymore.
+# For each agent, the result is the same as for an AgentCFE receiving the same observations.
+#
+class AgentBatchCFE:
+
+    def __init__(self, env, obs, time_horizon=30, lp_solver=None, model=None, rngs=None, epsilon=0.01):
+        # Sanity check
+        if time_horizon < 2:
+            raise RuntimeError("AgentBatchCFE::AgentBatchCFE the time horizon must be at least two.")
+
+        # Number of agents and time Horizon
+        obs = np.asarray(obs)
+        self.N = obs.size
+        self.T = time_horizon
+
+        # Convergence threshold
+        self.epsilon = epsilon
+
+        # Solver used to optimise the posterior over actions
+        self.lp_solver = SimplexSolver() if lp_solver is None else lp_solver
+
+        # Random number generators used for action selection, i.e. one per agent
+        self.rngs = [np.random] * self.N if rngs is None else rngs
+
+        # Prior parameters (shared between agents)
+        self.model = MazeModel(env) if model is None else model
+        n_states = self.model.n_states
+        n_actions = self.model.n_actions
+
+        # Shared parameters
+        self.e = np.full([self.N, self.T, n_actions], 1.0 / n_actions)
+
+        # Evidence, i.e. the observations made so far (identical number for all agents)
+        self.o = np.zeros([self.N, self.T + 1], dtype=int)
+        self.n_obs = 0
+
+        # Prior preferences
+        self.c = Ops.one_hot(env.observations(), 0)
+        self.log_p_c = self.model.log_likelihood(self.c)
+
+        # Log-likelihood of z(tau) for all agents and time steps, i.e. np.matmul(np.log(A).T, self.z(tau))
+        self.log_p_z = np.zeros([self.N, self.T + 1, n_states])
+        self.log_p_z[:, self.T - 1:] = self.log_p_c
+        self.observe(obs)
+
+        # Posterior parameters
+        self.b_hat = np.full([self.N, self.T, n_states, n_actions], 1.0 / n_states)
+        self.d_hat = np.full([self.N, n_states], 1.0 / n_states)
+
+        # Number of iterations performed by the last call to inference, for each agent
+        self.iterations = np.zeros(self.N, dtype=int)
+
+    def observe(self, obs):
+        # Add the new observations, and update the log-likelihood of the current time step
+        tau = self.n_obs
+        self.o[:, tau] = obs
+        self.n_obs += 1
+        self.log_p_z[:, tau] = self.model.observation_log_likelihood(obs)
+
+    def inference(self, agents=None):
+        # Only the agents in the list are updated (all agents if None)
+        cfe = np.full(self.N, float("inf"))
+        active = np.arange(self.N) if agents is None else np.asarray(agents)
+        self.iterations[:] = 0
+
+        while active.size != 0:
+            # Optimise parameters of the variational and compelled distributions of the active agents.
+            self.update_posterior_over_hidden_states(active)
+            self.update_posterior_over_actions_using_lp(active)
+            self.iterations[active] += 1
+
+            # Check convergence of the CFE, and mask out the agents that converged
+            new_cfe = self.cfe(active)
+            not_converged = cfe[active] - new_cfe >= self.epsilon
+            cfe[active] = new_cfe
+            active = active[not_converged]
+
+    def update_posterior_over_hidden_states(self, active):
+        b_hat = self.b_hat[active]
+        e = self.e[active]
+        log_p_z = self.log_p_z[active]
+
+        # Inference of initial hidden state
+        s = log_p_z[:, 0] + self.model.log_d
+        s += self.model.log_transition_backward(b_hat[:, 1] * e[:, 0, np.newaxis, :])
+        d_hat = softmax(s, 1)
+
+        # Messages coming from the future only depend on the current value of the posterior, see AgentCFE
+        future = self.model.log_transition_backward(b_hat[:, 1:] * e[:, 1:, np.newaxis, :])
+
+        # Inference of hidden states (tau > 0)
+        d_hat_tau = d_hat
+        for i in range(self.T):
+            s = log_p_z[:, i + 1] + (future[:, i] if i + 1 != self.T else 0)
+            s = s[:, :, np.newaxis] + self.model.log_transition_forward(d_hat_tau)
+            b_hat[:, i] = softmax(s, 1)
+            d_hat_tau = np.einsum("nsa,na->ns", b_hat[:, i], e[:, i])
+
+        self.d_hat[active] = d_hat
+        self.b_hat[active] = b_hat
+
+    def get_d_hats(self, active):
+        # Compute Q(S_tau) for all tau in [0, T], i.e. an array of shape [N, T + 1, S]
+        d_hats = np.einsum("ntsa,nta->nts", self.b_hat[active], self.e[active])
+        return np.concatenate([self.d_hat[active, np.newaxis], d_hats], axis=1)
+
+    def update_posterior_over_actions_using_lp(self, active):
+        b_hat = self.b_hat[active]
+        d_hats = self.get_d_hats(active)
+
+        # Compute the weights of all R(U_tau) at once
+        s = - self.log_p_z[active, 1:, :, np.newaxis]
+        s = s + np.log(b_hat)
+        s -= self.model.log_transition_forward(d_hats[:, 1:])
+        w = np.einsum("ntsa,ntsa->nta", s, b_hat)
+
+        # Compute the optimal parameters of all R(U_tau) at once
+        self.e[active] = self.lp_solver.solve(w)
+
+    def cfe(self, active):
+        b_hat = self.b_hat[active]
+        d_hat = self.d_hat[active]
+        d_hats = self.get_d_hats(active)[:, :self.T]
+
+        # Compute accuracy and expected disappointment
+        fe = - np.einsum("nts,nts->n", self.log_p_z[active, :self.T], d_hats)
+
+        # Compute complexity over initial states
+        fe += np.einsum("ns,ns->n", np.log(d_hat) - self.model.log_d, d_hat)
+
+        # Compute complexity over non-initial states
+        diff = np.log(b_hat) - self.model.log_transition_forward(d_hats)
+        fe += np.einsum("ntsa,ntsa,nta->n", diff, b_hat, self.e[active])
+        return fe
+
+    def action_selection(self, agents=None):
+        # Select the actions of the agents in the list (all agents if None)
+        agents = range(self.N) if agents is None else agents
+        p_actions = self.e[:, self.n_obs - 1]
+        n_actions = p_actions.shape[1]
+        return np.array([self.rngs[n].choice(np.arange(n_actions), p=p_actions[n]) for n in agents], dtype=int)
@@ -1,15 +1,23 @@
-from gekko import GEKKO
-from scipy.special import softmax
 import numpy as np
 from operators.Operators import Operators as Ops
+from operators.SimplexSolver import SimplexSolver
+from environments.MazeModel import MazeModel
+from agents.Posterior import Posterior
+from agents.FixedPointIteration import FixedPointIteration
 
 
 #
 # This class emulate the CFE agent.
 #
+# When log_domain is True, the posterior over hidden states is kept in log space (see Posterior), and dtype is the
+# type used to store it and the log-likelihoods of the evidence, e.g. np.float32 halves their memory.
+#
 class AgentCFE:
 
-    def __init__(self, env, obs, time_horizon=30):
+    def __init__(
+        self, env, obs, time_horizon=30, lp_solver=None, model=None, rng=None, fixed_point=None, incremental=None,
+        cache=None, epsilon=0.01, verbose=False, log_domain=False, dtype=np.float64
+    ):
         # Sanity check
         if time_horizon < 1:
             raise RuntimeError("CFE::CFE the time horizon must be at least one.")
@@ -18,41 +26,88 @@ class AgentCFE:
         self.T = time_horizon
 
         # Convergence threshold
-        self.epsilon = 0.01
+        self.epsilon = epsilon
 
-        # Prior parameters
-        self.a = env.a()
-        self.b = env.b()
-        self.d = env.d()
+        # Whether to print the CFE after each inference
+        self.verbose = verbose
 
-        # Shared parameters
-        self.e = []
-        for i in range(self.T):
-            self.e.append(Ops.uniform([env.actions()]))
+        # Strategy of the fixed-point iterations performed during inference, and number of iterations of each inference
+        self.fixed_point = FixedPointIteration() if fixed_point is None else fixed_point
+        self.iterations = []
+
+        # Incremental inference used after the first action-perception cycle (None for full inference at each cycle)
+        self.incremental = incremental
+
+        # Cache of converged posteriors, shared by agents with the same parameters (None to disable caching)
+        self.cache = cache
+
+        # Solver used to optimise the posterior over actions
+        self.lp_solver = SimplexSolver() if lp_solver is None else lp_solver
+
+        # Random number generator used for action selection (either np.random or a np.random.Generator)
+        self.rng = np.random if rng is None else rng
+
+        # Prior parameters (shared between agents)
+        self.model = MazeModel(env) if model is None else model
 
-        # Evidence
-        self.o = []
-        self.o.append(Ops.one_hot(env.observations(), obs))
+        # Log-prior over the initial hidden state, i.e. log(D) unless the agent starts from another belief
+        self.log_d = self.model.log_d
+
+        # Evidence, i.e. one-hot encoding of the observations made so far
+        self.o = np.zeros([self.T + 1, env.observations()])
+        self.n_obs = 0
 
         # Prior preferences
         self.c = Ops.one_hot(env.observations(), 0)
         # OR self.c = softmax(env.observations() - np.arange(0, env.observations()), axis=0)
 
-        # Posterior parameters
-        self.b_hat = []
-        for i in range(self.T):
-            self.b_hat.append(Ops.uniform([env.states(), env.actions()]))
-        self.d_hat = Ops.uniform([env.states()])
+        # Log-likelihood of z(tau) for all time steps, i.e. np.matmul(np.log(A).T, self.z(tau))
+        self.log_p_z = np.zeros([self.T + 1, self.model.n_states], dtype=dtype)
+        self.log_p_z[self.T - 1:] = self.model.log_likelihood(self.c)
+        self.observe(obs)
+
+        # Posterior and shared parameters
+        self.posterior = Posterior(env.states(), env.actions(), self.T, log_domain, dtype)
+
+    # The posterior parameters must only be modified through self.posterior, to keep the cached marginals valid.
+
+    @property
+    def d_hat(self):
+        return self.posterior.d_hat
+
+    @property
+    def b_hat(self):
+        return self.posterior.b_hat
+
+    @property
+    def e(self):
+        return self.posterior.e
 
     def step(self, env):
         self.inference()
         action = self.action_selection()
         obs = env.execute(action)
-        self.o.append(Ops.one_hot(env.observations(), obs))
+        self.observe(obs)
+        return action
+
+    def observe(self, obs):
+        self.o[self.n_obs][obs] = 1
+        self.log_p_z[self.n_obs] = self.model.observation_log_likelihood(obs)
+        self.n_obs += 1
 
     def inference(self):
-        cfe = float("inf")
         actions = self.e[0].size
+
+        # Reuse the posterior of a previous agent that received the same observations
+        if self.cache is not None:
+            observations = tuple(self.o[:self.n_obs].argmax(axis=1).tolist())
+            cached = self.cache.get(self.model, observations)
+            if cached is not None:
+                self.load_posterior(cached)
+                self.iterations.append(0)
+                if self.verbose:
+                    print("cfe:" + str(cached[3]))
+                return
         # bad_actions = [MazeEnvAction.UP] * self.T
         # good_actions_maze_5 = \
         #     [MazeEnvAction.LEFT, MazeEnvAction.UP, MazeEnvAction.UP, MazeEnvAction.RIGHT] + \
@@ -60,45 +115,66 @@ class AgentCFE:
         # good_actions_maze_1 = \
         #     [MazeEnvAction.UP] * 4 + [MazeEnvAction.RIGHT] * (self.T - 4)
 
-        while True:
-            # Optimise parameters of the variational and compelled distributions.
-            self.update_posterior_over_hidden_states(actions)
-            self.update_posterior_over_actions(actions, "LinProg")
-            # OR self.update_posterior_over_actions(actions_seq, "Fixed")
-
-            # Check convergence of the CFE
-            new_cfe = self.cfe()
-            if cfe - new_cfe < self.epsilon:
-                break
-            cfe = new_cfe
-
-        print("cfe:" + str(cfe))
+        # Optimise parameters of the variational and compelled distributions until convergence.
+        # OR self.update_posterior_over_actions(actions_seq, "Fixed") in FixedPointIteration.run
+        if self.incremental is not None and len(self.iterations) != 0:
+            # Only the last observation is new, the rest of the posterior is reused,
+            # and its local updates are counted in full iterations, i.e. T + 1 factor updates each, rounded up
+            cfe = self.incremental.run(self, actions, self.n_obs - 1)
+            iterations = int(np.ceil(self.incremental.updates / (self.T + 1)))
+            if self.incremental.fallback:
+                iterations += self.fixed_point.iterations
+            self.iterations.append(iterations)
+        else:
+            cfe = self.fixed_point.run(self, actions)
+            self.iterations.append(self.fixed_point.iterations)
+
+        # Store the converged posterior
+        if self.cache is not None:
+            self.cache.put(self.model, observations, (self.d_hat.copy(), self.b_hat.copy(), self.e.copy(), cfe))
+
+        if self.verbose:
+            print("cfe:" + str(cfe))
+
+    def load_posterior(self, posterior):
+        d_hat, b_hat, e = posterior[:3]
+        self.posterior.set_d_hat(d_hat)
+        self.posterior.set_all_b_hat(b_hat)
+        self.posterior.set_all_e(e)
 
     def update_posterior_over_hidden_states(self, actions):
         # Inference of initial hidden state
-        s = np.zeros(self.d_hat.shape)
-        s += np.matmul(np.log(self.a).T, self.z(0))
-        s += np.log(self.d)
-        s += Ops.average(np.log(self.b), Ops.multiplication(self.b_hat[1], self.e[0], [1]), [0, 2])
-        self.d_hat = softmax(s, 0)
+        self.update_posterior_over_initial_hidden_state()
+
+        # Messages coming from the future only depend on b_hat[i + 1] and e[i + 1], which are updated after b_hat[i]
+        future = self.model.log_transition_backward(self.b_hat[1:] * self.e[1:, np.newaxis, :])
 
         # Inference of hidden states (tau > 0)
         for i in range(self.T):
-            s = np.zeros(self.b_hat[i].shape)
-            s += Ops.expansion(np.matmul(np.log(self.a).T, self.z(i + 1)), actions, 1)
+            self.update_posterior_over_hidden_state(i, actions, future[i] if i + 1 != self.T else 0)
+
+    def update_posterior_over_initial_hidden_state(self):
+        s = self.log_p_z[0] + self.log_d
+        s += self.model.log_transition_backward(Ops.multiplication(self.b_hat[1], self.e[0], [1]))
+        self.posterior.update_d_hat(s)
+
+    def update_posterior_over_hidden_state(self, i, actions, future=None):
+        # Update Q(S_i+1|U_i), where future is the message coming from Q(S_i+2|U_i+1) if already computed
+        if future is None:
+            future = 0
             if i + 1 != self.T:
-                tmp = Ops.average(np.log(self.b), Ops.multiplication(self.b_hat[i + 1], self.e[i + 1], [1]), [0, 2])
-                s += Ops.expansion(tmp, actions, 1)
-            s += Ops.average(np.log(self.b), self.get_d_hat(i), [1])
-            self.b_hat[i] = softmax(s, 0)
+                future = self.model.log_transition_backward(Ops.multiplication(self.b_hat[i + 1], self.e[i + 1], [1]))
+        s = self.log_p_z[i + 1] + future
+        s = Ops.expansion(s, actions, 1) + self.model.log_transition_forward(self.get_d_hat(i))
+        self.posterior.update_b_hat(i, s)
 
     def z(self, tau):
-        if len(self.o) <= tau < self.T - 1:
+        if self.n_obs <= tau < self.T - 1:
             return np.zeros(self.c.shape)
-        return self.c if tau >= len(self.o) else self.o[tau]
+        return self.c if tau >= self.n_obs else self.o[tau]
 
     def get_d_hat(self, tau):
-        return self.d_hat if tau == 0 else np.matmul(self.b_hat[tau - 1], self.e[tau - 1])
+        return self.posterior.get_d_hat(tau)
 
     def update_posterior_over_actions(self, actions, update_type):
         if update_type == "LinProg":
@@ -108,61 +184,50 @@ class AgentCFE:
 
     def update_posterior_over_actions_using_f(self, actions):
         # Iterate over all actions
-        for tau in range(self.T):
-            self.e[tau] = Ops.one_hot(self.e[tau].size, actions[tau])
+        self.posterior.set_all_e(np.eye(self.e.shape[1])[actions[:self.T]])
 
     def update_posterior_over_actions_using_lp(self, actions):
-        # Iterate over all actions
-        for tau in range(self.T):
-
-            # Create the linear programming solver
-            solver = GEKKO(remote=False)
-
-            # Create one variables for each parameter of R(U_tau)
-            variables = solver.Array(solver.Var, [actions])
-            for i in range(actions):
-                variables[i].lower = 0
-                variables[i].upper = 1
+        # The weights of R(U_tau) only depend on the current value of R(U_tau), so all problems are independent.
+        w = self.compute_all_linear_programming_weights()
 
-            # Constrain the parameters of R(U_tau) to remain on the simplex
-            solver.Equation(solver.sum(variables) == 1)
+        # Compute the optimal parameters of all R(U_tau) at once
+        self.posterior.set_all_e(self.lp_solver.solve(w))
 
-            # Create the objective function
-            w = self.compute_linear_programming_weights(tau)
-            solver.qobj(w, x=variables, otype="min")
-
-            # Compute the optimal parameter of R(U_tau)
-            solver.solve(disp=False)
-
-            # Retrieve the results
-            for i in range(actions):
-                self.e[tau][i] = variables[i].value[0]
+    def update_posterior_over_action_using_lp(self, tau):
+        # Update R(U_tau) only
+        self.posterior.set_e(tau, self.lp_solver.solve(self.compute_linear_programming_weights(tau)))
 
     def compute_linear_programming_weights(self, tau):
         s = np.zeros(self.b_hat[0].shape)
 
-        s += Ops.expansion(- np.matmul(np.log(self.a).T, self.z(tau + 1)), s.shape[1], 1)
-        s += np.log(self.b_hat[tau])
-        s += - Ops.average(np.log(self.b), self.get_d_hat(tau + 1), [1])
+        s += Ops.expansion(- self.log_p_z[tau + 1], s.shape[1], 1)
+        s += self.posterior.get_log_b_hat(tau)
+        s += - self.model.log_transition_forward(self.get_d_hat(tau + 1))
         return Ops.average(s, self.b_hat[tau], [0, 1], [1])
 
+    def compute_all_linear_programming_weights(self):
+        # Same as compute_linear_programming_weights, but for all tau at once
+        b_hat = self.posterior.b_hat
+        s = - self.log_p_z[1:, :, np.newaxis] + self.posterior.get_log_b_hat()
+        s -= self.model.log_transition_forward(self.posterior.get_d_hats()[1:])
+        return np.einsum("tsa,tsa->ta", s, b_hat)
+
     def cfe(self, with_constant=False):
-        fe = 0
+        b_hat = self.posterior.b_hat
+        d_hat = self.posterior.d_hat
+        d_hats = self.posterior.get_d_hats()[:self.T]
 
         # Compute accuracy and expected disappointment
-        for tau in range(self.T):
-            fe -= np.inner(np.matmul(np.log(self.a).T, self.z(tau)), self.get_d_hat(tau))
-            if tau >= len(self.o) and with_constant:
-                fe = np.inner(self.c, np.log(self.c))
+        fe = - np.einsum("ts,ts->", self.log_p_z[:self.T], d_hats)
+        if self.n_obs < self.T and with_constant:
+            fe = np.inner(self.c, np.log(self.c))
 
         # Compute complexity over initial states
-        fe += np.inner(np.log(self.d_hat) - np.log(self.d), self.d_hat)
+        fe += np.inner(self.posterior.get_log_d_hat() - self.log_d, d_hat)
 
         # Compute complexity over non-initial states
-        for tau in range(self.T):
-            diff = np.log(self.b_hat[tau]) - Ops.average(np.log(self.b), self.get_d_hat(tau), [1])
-            joint = Ops.multiplication(self.b_hat[tau], self.e[tau], [1])
-            fe += Ops.average(diff, joint, [0, 1])
+        diff = self.posterior.get_log_b_hat() - self.model.log_transition_forward(d_hats)
+        fe += np.einsum("tsa,tsa,ta->", diff, b_hat, self.posterior.e)
         return fe
 
     def print_posterior(self):
@@ -189,6 +254,6 @@ class AgentCFE:
             print(np.around(self.e[i], decimals=2))
 
     def action_selection(self):
-        p_actions = self.e[len(self.o) - 1]
+        p_actions = self.e[self.n_obs - 1]
         n_actions = p_actions.size
-        return np.random.choice(np.arange(n_actions), p=p_actions)
+        return self.rng.choice(np.arange(n_actions), p=p_actions)
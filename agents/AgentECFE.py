@@ -1,16 +1,22 @@
-from gekko import GEKKO
 from scipy.special import softmax
 import numpy as np
 from operators.Operators import Operators as Ops
+from operators.SimplexSolver import SimplexSolver
+from environments.MazeModel import MazeModel
 from environments.MazeEnvAction import MazeEnvAction
 
 
 #
 # This class emulate the CFE agent.
 #
+# When log_domain is True, the logarithms of the posterior over hidden states are stored along with it, i.e. the
+# posterior is normalised in log space, and dtype is the type used to store it (e.g. np.float32).
+#
 class AgentCFE:
 
-    def __init__(self, env, obs, time_horizon=30):
+    def __init__(
+        self, env, obs, time_horizon=30, lp_solver=None, model=None, rng=None, log_domain=False, dtype=np.float64
+    ):
         # Sanity check
         if time_horizon < 1:
             raise RuntimeError("CFE::CFE the time horizon must be at least one.")
@@ -21,75 +27,114 @@ class AgentCFE:
         # Convergence threshold
         self.epsilon = 0.01
 
-        # Prior parameters
-        self.a = env.a()
-        self.b = env.b()
-        self.d = env.d()
+        # Solver used to optimise the posterior over actions
+        self.lp_solver = SimplexSolver() if lp_solver is None else lp_solver
+
+        # Random number generator used for action selection (either np.random or a np.random.Generator)
+        self.rng = np.random if rng is None else rng
+
+        # Prior parameters (shared between agents)
+        self.model = MazeModel(env) if model is None else model
 
         # Shared parameters
         self.e = []
         for i in range(self.T):
             self.e.append(Ops.uniform([env.actions()]))
 
+        # Numerics of the posterior and of the log-likelihoods of the evidence
+        self.log_domain = log_domain
+        self.dtype = dtype
+
         # Evidence
         self.o = []
         self.o.append(Ops.one_hot(env.observations(), obs))
+        self.log_p_o = []
+        self.log_p_o.append(self.model.observation_log_likelihood(obs).astype(dtype))
 
         # Prior preferences
         # TODO self.c = softmax(env.observations() - np.arange(0, env.observations()), axis=0)
         self.c = Ops.one_hot(env.observations(), 0)
+        self.log_p_c = self.model.log_likelihood(self.c).astype(dtype)
 
-        # Posterior parameters
+        # Posterior parameters, and their logarithms (log-domain only)
         self.b_hat = []
         for i in range(self.T):
-            self.b_hat.append(Ops.uniform([env.states(), env.actions()]))
-        self.d_hat = Ops.uniform([env.states()])
+            self.b_hat.append(Ops.uniform([env.states(), env.actions()]).astype(dtype))
+        self.d_hat = Ops.uniform([env.states()]).astype(dtype)
+        self.log_b_hat = [np.log(b_hat) for b_hat in self.b_hat] if log_domain else None
+        self.log_d_hat = np.log(self.d_hat) if log_domain else None
 
     def step(self, env):
         self.inference()
         action = self.action_selection()
         obs = env.execute(action)
-        self.o.append(Ops.one_hot(env.observations(), obs))
+        self.observe(obs)
 
-    def inference(self):
+    def observe(self, obs):
+        self.o.append(Ops.one_hot(self.model.n_observations, obs))
+        self.log_p_o.append(self.model.observation_log_likelihood(obs).astype(self.dtype))
+
+    def inference(self, policy=None):
+        # The posterior over actions is pinned to the policy, i.e. a sequence of T actions (good_actions if None),
+        # see PolicyEvaluation to evaluate many policies at once
         cfe = float("inf")
         actions = self.e[0].size
         bad_actions = [MazeEnvAction.UP] * 30
         good_actions = [MazeEnvAction.LEFT, MazeEnvAction.UP, MazeEnvAction.UP, MazeEnvAction.RIGHT] + \
                        [MazeEnvAction.IDLE] * 26
+        policy = good_actions if policy is None else policy
 
         while True:
             # Optimise parameters of the variational and compelled distributions.
             self.update_posterior_over_hidden_states(actions)
-            self.update_posterior_over_actions(good_actions, "Fixed")
+            self.update_posterior_over_actions(policy, "Fixed")
 
             # Check convergence of the CFE
             new_cfe = self.cfe()
             if cfe - new_cfe < self.epsilon:
-                break
+                return new_cfe
             cfe = new_cfe
 
     def update_posterior_over_hidden_states(self, actions):
         # Inference of initial hidden state
         s = np.zeros(self.d_hat.shape)
-        s += np.matmul(np.log(self.a).T, self.z(0))
-        s += np.log(self.d)
-        s += Ops.average(np.log(self.b), Ops.multiplication(self.b_hat[1], self.e[0], [1]), [0, 2])
-        self.d_hat = softmax(s, 0)
+        s += self.log_likelihood(0)
+        s += self.model.log_d
+        s += self.model.log_transition_backward(Ops.multiplication(self.b_hat[1], self.e[0], [1]))
+        self.d_hat, self.log_d_hat = self.normalise(s)
 
         # Inference of hidden states (tau > 0)
         for i in range(self.T):
             s = np.zeros(self.b_hat[i].shape)
-            s += Ops.expansion(np.matmul(np.log(self.a).T, self.z(i + 1)), actions, 1)
+            s += Ops.expansion(self.log_likelihood(i + 1), actions, 1)
             if i + 1 != self.T:
-                tmp = Ops.average(np.log(self.b), Ops.multiplication(self.b_hat[i + 1], self.e[i], [1]), [0, 2])
+                tmp = self.model.log_transition_backward(Ops.multiplication(self.b_hat[i + 1], self.e[i], [1]))
                 s += Ops.expansion(tmp, actions, 1)
-            s += Ops.average(np.log(self.b), self.get_d_hat(i), [1])
-            self.b_hat[i] = softmax(s, 0)
+            s += self.model.log_transition_forward(self.get_d_hat(i))
+            self.b_hat[i], log_b_hat = self.normalise(s)
+            if self.log_domain:
+                self.log_b_hat[i] = log_b_hat
+
+    def normalise(self, s):
+        # Normalise the unnormalised log-probabilities s over the states, and return the result and its logarithm
+        if self.log_domain:
+            log_p = Ops.log_normalise(s, 0)
+            return np.exp(log_p).astype(self.dtype, copy=False), log_p.astype(self.dtype, copy=False)
+        return softmax(s, 0).astype(self.dtype, copy=False), None
+
+    def get_log_d_hat(self):
+        return self.log_d_hat if self.log_domain else np.log(self.d_hat)
+
+    def get_log_b_hat(self, tau):
+        return self.log_b_hat[tau] if self.log_domain else np.log(self.b_hat[tau])
 
     def z(self, tau):
         return self.c if tau >= len(self.o) else self.o[tau]
 
+    def log_likelihood(self, tau):
+        # Equivalent to np.matmul(np.log(A).T, self.z(tau)) using the cached projections
+        return self.log_p_c if tau >= len(self.o) else self.log_p_o[tau]
+
     def get_d_hat(self, tau):
         return self.d_hat if tau == 0 else np.matmul(self.b_hat[tau - 1], self.e[tau - 1])
 
@@ -105,38 +150,20 @@ class AgentCFE:
             self.e[tau] = Ops.one_hot(self.e[tau].size, actions[tau])
 
     def update_posterior_over_actions_using_lp(self, actions):
-        # Iterate over all actions
-        for tau in range(self.T):
-
-            # Create the linear programming solver
-            solver = GEKKO(remote=False)
-
-            # Create one variables for each parameter of R(U_tau)
-            variables = solver.Array(solver.Var, [actions])
-            for i in range(actions):
-                variables[i].lower = 0
-                variables[i].upper = 1
+        # The weights of R(U_tau) only depend on the current value of R(U_tau), so all problems are independent.
+        w = np.array([self.compute_linear_programming_weights(tau) for tau in range(self.T)])
 
-            # Constrain the parameters of R(U_tau) to remain on the simplex
-            solver.Equation(solver.sum(variables) == 1)
-
-            # Create the objective function
-            w = self.compute_linear_programming_weights(tau)
-            solver.qobj(w, x=variables, otype="min")
-
-            # Compute the optimal parameter of R(U_tau)
-            solver.solve(disp=False)
-
-            # Retrieve the results
-            for i in range(actions):
-                self.e[tau][i] = variables[i].value[0]
+        # Compute the optimal parameters of all R(U_tau) at once
+        solution = self.lp_solver.solve(w)
+        for tau in range(self.T):
+            self.e[tau] = solution[tau]
 
     def compute_linear_programming_weights(self, tau):
         s = np.zeros(self.b_hat[0].shape)
 
-        s += Ops.expansion(- np.matmul(np.log(self.a).T, self.z(tau + 1)), s.shape[1], 1)
-        s += np.log(self.b_hat[tau])
-        s += - Ops.average(np.log(self.b), self.get_d_hat(tau + 1), [1])
+        s += Ops.expansion(- self.log_likelihood(tau + 1), s.shape[1], 1)
+        s += self.get_log_b_hat(tau)
+        s += - self.model.log_transition_forward(self.get_d_hat(tau + 1))
         return Ops.average(s, self.b_hat[tau], [0, 1], [1])
 
     def cfe(self, with_constant=False):
@@ -144,16 +171,16 @@ class AgentCFE:
 
         # Compute accuracy and expected disappointment
         for tau in range(self.T):
-            fe -= np.inner(np.matmul(np.log(self.a).T, self.z(tau)), self.get_d_hat(tau))
+            fe -= np.inner(self.log_likelihood(tau), self.get_d_hat(tau))
             if tau >= len(self.o) and with_constant:
                 fe = np.inner(self.c, np.log(self.c))
 
         # Compute complexity over initial states
-        fe += np.inner(np.log(self.d_hat) - np.log(self.d), self.d_hat)
+        fe += np.inner(self.get_log_d_hat() - self.model.log_d, self.d_hat)
 
         # Compute complexity over non-initial states
         for tau in range(self.T):
-            diff = np.log(self.b_hat[tau]) - Ops.average(np.log(self.b), self.get_d_hat(tau), [1])
+            diff = self.get_log_b_hat(tau) - self.model.log_transition_forward(self.get_d_hat(tau))
             joint = Ops.multiplication(self.b_hat[tau], self.e[tau], [1])
             fe += Ops.average(diff, joint, [0, 1])
 
@@ -185,4 +212,4 @@ class AgentCFE:
     def action_selection(self):
         p_actions = self.e[len(self.o) - 1]
         n_actions = p_actions.size
-        return np.random.choice(np.arange(n_actions), p=p_actions)
+        return self.rng.choice(np.arange(n_actions), p=p_actions)
@@ -0,0 +1,98 @@
+import numpy as np
+from agents.AgentCFE import AgentCFE
+from environments.MazeModel import MazeModel
+
+
+#
+# This class emulates a CFE agent planning over a sliding window of W time steps, instead of the whole episode.
+# At each action-perception cycle, an AgentCFE with time horizon W (the planner) performs inference from the current
+# time step, where the past is summarised by the belief over the current hidden state, i.e. the initial state of the
+# window has the prior P(S_t|o_0:t-1, u_0:t-1) predicted from the filtered belief of the previous time step. So, the
+# cost of each cycle and the memory only depend on W, and the number of cycles of an episode is unbounded.
+#
+# When warm_start is True, the posterior of the previous window, shifted by one time step, is used as the starting
+# point of the next inference. The first window is identical to an AgentCFE with time horizon W.
+#
+# The numerics of the planners (log_domain and dtype) are the same as for AgentCFE.
+#
+class AgentRecedingCFE:
+
+    def __init__(
+        self, env, obs, window=10, lp_solver=None, model=None, rng=None, fixed_point=None, epsilon=0.01,
+        warm_start=True, verbose=False, log_domain=False, dtype=np.float64
+    ):
+        # Sanity check
+        if window < 2:
+            raise RuntimeError("In AgentRecedingCFE, the window must be at least two.")
+
+        # Parameters of the planners
+        self.W = window
+        self.env = env
+        self.lp_solver = lp_solver
+        self.rng = np.random if rng is None else rng
+        self.fixed_point = fixed_point
+        self.epsilon = epsilon
+        self.warm_start = warm_start
+        self.verbose = verbose
+        self.log_domain = log_domain
+        self.dtype = dtype
+
+        # Prior parameters (shared between agents)
+        self.model = MazeModel(env) if model is None else model
+
+        # Predicted and filtered beliefs over the current hidden state, i.e. before and after the last observation
+        self.prior = self.model.d
+        self.belief = self.filter(obs)
+
+        # Number of iterations of each inference, and posterior over actions used at each time step
+        self.iterations = []
+        self.e = []
+
+        # Planner of the current window
+        self.planner = self.create_planner(obs)
+
+    def create_planner(self, obs):
+        planner = AgentCFE(
+            self.env, obs, time_horizon=self.W, lp_solver=self.lp_solver, model=self.model, rng=self.rng,
+            fixed_point=self.fixed_point, epsilon=self.epsilon, verbose=self.verbose, log_domain=self.log_domain,
+            dtype=self.dtype
+        )
+        planner.log_d = np.log(self.prior)
+        return planner
+
+    def filter(self, obs):
+        # Update the predicted belief with the observation
+        belief = self.prior * self.model.observation_likelihood(obs)
+        return belief / belief.sum()
+
+    def step(self, env):
+        self.inference()
+        action = self.action_selection()
+        obs = env.execute(action)
+        self.observe(action, obs)
+        return action
+
+    def inference(self):
+        self.planner.inference()
+        self.iterations.append(self.planner.iterations[-1])
+
+    def action_selection(self):
+        self.e.append(self.planner.e[0].copy())
+        return self.planner.action_selection()
+
+    def observe(self, action, obs):
+        # Predict the next hidden state, and update the belief with the new observation
+        self.prior = self.model.transition_forward(self.belief)[:, action]
+        self.belief = self.filter(obs)
+
+        # Slide the window by one time step
+        previous = self.planner
+        self.planner = self.create_planner(obs)
+        if self.warm_start:
+            posterior = self.planner.posterior
+            posterior.set_d_hat(self.belief)
+            posterior.set_all_b_hat(np.concatenate([previous.b_hat[1:], posterior.b_hat[-1:]]))
+            posterior.set_all_e(np.concatenate([previous.e[1:], posterior.e[-1:]]))
+
+    def cfe(self):
+        return self.planner.cfe()
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+#
+# This class performs the fixed-point iterations of AgentCFE.inference, i.e. it alternates the updates of the
+# posterior over hidden states and actions until convergence. The default parameters reproduce the original loop,
+# i.e. stop as soon as the CFE decreases by less than the agent's epsilon. Optionally:
+#  - criterion="posterior" stops when the largest change of the posterior over hidden states is below the
+#    tolerance, which avoids computing the CFE at each iteration. The solution of the linear programs can keep
+#    jumping between vertices of the simplex (so the posterior over hidden states never settles), hence the CFE test
+#    is used instead for the iterations in which the posterior over actions changed. The number of iterations is
+#    also bounded by default_max_iterations if not specified;
+#  - max_iterations bounds the number of iterations;
+#  - damping mixes the new posterior over hidden states with the previous one, i.e. x = (1 - damping) g(x) + damping x;
+#  - acceleration="aitken" or "anderson" extrapolates the posterior over hidden states from the previous iterates.
+# Damping and acceleration preserve the fixed points of the updates, but the updates of the posterior over actions
+# often do not converge (the solution of the linear programs keeps jumping between vertices), and the loop then stops
+# wherever the CFE stops decreasing. So, on such mazes (e.g. 9.maze and 12.maze), damping and acceleration can stop
+# at a different posterior than the default loop, and change the policy of the agent.
+# The number of iterations performed by the last call to run is stored in self.iterations.
+#
+class FixedPointIteration:
+
+    # Maximum number of iterations used with the "posterior" criterion, when max_iterations is None.
+    default_max_iterations = 100
+
+    def __init__(self, criterion="cfe", tolerance=None, max_iterations=None, damping=0.0, acceleration=None, depth=3):
+        # Sanity check
+        if criterion not in ["cfe", "posterior"]:
+            raise RuntimeError("In FixedPointIteration, unknown convergence criterion '" + str(criterion) + "'.")
+        if acceleration not in [None, "aitken", "anderson"]:
+            raise RuntimeError("In FixedPointIteration, unknown acceleration '" + str(acceleration) + "'.")
+        if not 0 <= damping < 1:
+            raise RuntimeError("In FixedPointIteration, the damping must be in [0, 1).")
+        if max_iterations is not None and max_iterations < 1:
+            raise RuntimeError("In FixedPointIteration, the maximum number of iterations must be at least one.")
+
+        # Parameters of the iterations
+        self.criterion = criterion
+        self.tolerance = tolerance
+        if max_iterations is None and criterion == "posterior":
+            max_iterations = FixedPointIteration.default_max_iterations
+        self.max_iterations = max_iterations
+        self.damping = damping
+        self.acceleration = acceleration
+        self.depth = depth
+
+        # Statistics and history of the iterates
+        self.iterations = 0
+        self.history = []
+
+    def run(self, agent, actions):
+        cfe = float("inf")
+        tolerance = agent.epsilon if self.tolerance is None else self.tolerance
+        self.iterations = 0
+        self.history = []
+
+        while True:
+            # Optimise parameters of the variational and compelled distributions.
+            previous = FixedPointIteration.get_state(agent)
+            agent.update_posterior_over_hidden_states(actions)
+            agent.update_posterior_over_actions(actions, "LinProg")
+            self.iterations += 1
+
+            # Damp and accelerate the update of the posterior over hidden states.
+            if self.damping > 0 or self.acceleration is not None:
+                self.update_hidden_states(agent, previous)
+
+            # Check convergence, where the CFE of the final posterior is returned whatever the stopping condition
+            if self.max_iterations is not None and self.iterations >= self.max_iterations:
+                return agent.cfe()
+            if self.criterion == "posterior" and np.abs(agent.e - previous[2]).max() < tolerance:
+                if FixedPointIteration.change(agent, previous) < tolerance:
+                    return agent.cfe()
+                cfe = float("inf")
+                continue
+            new_cfe = agent.cfe()
+            if cfe - new_cfe < tolerance:
+                return new_cfe
+            cfe = new_cfe
+
+    @staticmethod
+    def get_state(agent):
+        return agent.d_hat.copy(), agent.b_hat.copy(), agent.e.copy()
+
+    @staticmethod
+    def change(agent, previous):
+        # The largest change of the posterior over hidden states
+        d_hat, b_hat, _ = previous
+        return max(np.abs(agent.d_hat - d_hat).max(), np.abs(agent.b_hat - b_hat).max())
+
+    def update_hidden_states(self, agent, previous):
+        # Flatten the posterior over hidden states before (x) and after (g) the update
+        x = np.concatenate([previous[0], previous[1].ravel()])
+        g = np.concatenate([agent.d_hat, agent.b_hat.ravel()])
+
+        # Damping
+        if self.damping > 0:
+            g = (1 - self.damping) * g + self.damping * x
+
+        # Acceleration
+        if self.acceleration == "anderson":
+            g = self.anderson(x, g)
+        elif self.acceleration == "aitken":
+            g = self.aitken(x, g)
+
+        # Project the result back onto the simplex, and store it in the agent's posterior
+        n_states = agent.d_hat.size
+        agent.posterior.set_d_hat(FixedPointIteration.normalise(g[:n_states], 0))
+        agent.posterior.set_all_b_hat(FixedPointIteration.normalise(g[n_states:].reshape(agent.b_hat.shape), 1))
+
+    def anderson(self, x, g):
+        # Anderson mixing, i.e. combine the last iterates to minimise the residual f = g(x) - x
+        self.history.append((g - x, g))
+        self.history = self.history[-(self.depth + 1):]
+        if len(self.history) < 2:
+            return g
+        df = np.stack([self.history[k + 1][0] - self.history[k][0] for k in range(len(self.history) - 1)], axis=1)
+        dg = np.stack([self.history[k + 1][1] - self.history[k][1] for k in range(len(self.history) - 1)], axis=1)
+        gamma = np.linalg.lstsq(df, g - x, rcond=None)[0]
+        return g - dg @ gamma
+
+    def aitken(self, x, g):
+        # Vector Aitken (Irons-Tuck) extrapolation from three successive iterates, restarted after each extrapolation
+        if len(self.history) == 0:
+            self.history = [x]
+        self.history.append(g)
+        if len(self.history) < 3:
+            return g
+        x0, x1, x2 = self.history
+        self.history = []
+        d2 = x2 - x1
+        dd = d2 - (x1 - x0)
+        norm = np.inner(dd, dd)
+        return x2 if norm == 0 else x2 - (np.inner(d2, dd) / norm) * d2
+
+    @staticmethod
+    def normalise(x, axis):
+        x = np.maximum(x, np.finfo(x.dtype).tiny)
+        return x / x.sum(axis=axis, keepdims=True)
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+#
+# This class performs the inference of AgentCFE incrementally after a new observation. Only the log-likelihood of
+# the new observation's time step changes, so the update starts from the posterior factors using it, i.e.
+# Q(S_t|U_t-1) and R(U_t-1), and is then propagated to the neighbouring time steps, as long as the factors change
+# by more than the tolerance. The previous posterior is used as a starting point.
+#
+# If the number of local updates exceeds threshold * T, i.e. the change spread too far, the inference falls back
+# to the agent's full fixed-point iterations.
+#
+class IncrementalInference:
+
+    def __init__(self, tolerance=0.001, threshold=1.0):
+        # Parameters of the incremental updates
+        self.tolerance = tolerance
+        self.threshold = threshold
+
+        # Statistics, i.e. number of local updates and whether a full inference was performed during the last call
+        self.updates = 0
+        self.fallback = False
+
+    def run(self, agent, actions, tau):
+        self.updates = 0
+        self.fallback = False
+        max_updates = int(self.threshold * agent.T)
+
+        # Time steps whose factors must be updated, where -1 stands for Q(S_0), and tau for Q(S_tau+1|U_tau), R(U_tau)
+        dirty = {tau - 1}
+
+        while len(dirty) != 0:
+            # Fall back to full inference if the change spread too far
+            if self.updates >= max_updates:
+                self.fallback = True
+                return agent.fixed_point.run(agent, actions)
+
+            # Update the earliest factor first
+            i = min(dirty)
+            dirty.remove(i)
+            self.updates += 1
+            if i == -1:
+                d_hat = agent.d_hat.copy()
+                agent.update_posterior_over_initial_hidden_state()
+                if np.abs(agent.d_hat - d_hat).max() > self.tolerance:
+                    dirty.add(0)
+                continue
+            b_hat = agent.b_hat[i].copy()
+            e = agent.e[i].copy()
+            agent.update_posterior_over_hidden_state(i, actions)
+            agent.update_posterior_over_action_using_lp(i)
+
+            # Mark the factors depending on Q(S_i+1|U_i) and R(U_i) if they changed
+            if max(np.abs(agent.b_hat[i] - b_hat).max(), np.abs(agent.e[i] - e).max()) > self.tolerance:
+                dirty |= {j for j in [i - 1, i + 1] if 0 <= j < agent.T}
+                if i <= 1:
+                    dirty.add(-1)
+
+        return agent.cfe()
@@ -0,0 +1,166 @@
+from scipy.special import softmax
+import numpy as np
+from operators.Operators import Operators as Ops
+
+
+#
+# This class evaluates many policies (i.e. fixed sequences of T actions) for an AgentECFE at once, i.e. for each
+# policy, it performs the same fixed-point iterations as AgentECFE.inference(policy), starting from the agent's
+# current evidence and a uniform posterior, and returns the converged CFE. The policies are given as an array of
+# shape [K, T], and are processed in chunks of at most chunk_size policies, so the memory does not depend on K.
+# Within a chunk, the policies whose CFE already converged are masked out, see AgentBatchCFE.
+#
+# The policies are sorted so that the policies sharing a prefix are in the same chunk, and the factors of the
+# posterior that only depend on a common prefix are computed once for all these policies. During the first
+# iteration the posterior over actions is uniform, so the factors do not depend on the policy at all, and each
+# iteration then extends the prefix on which Q(S_tau+1|U_tau) depends by one action.
+#
+# When posteriors is True, the marginals Q(S_tau) of the converged posteriors, for tau in [0, T], are stored in
+# self.d_hats (an array of shape [K, T + 1, S]). The number of iterations of each policy is stored in self.iterations.
+#
+class PolicyEvaluation:
+
+    def __init__(self, chunk_size=256, posteriors=False):
+        # Sanity check
+        if chunk_size < 1:
+            raise RuntimeError("In PolicyEvaluation, the chunk size must be at least one.")
+
+        # Parameters of the evaluation
+        self.chunk_size = chunk_size
+        self.posteriors = posteriors
+
+        # Statistics and marginal posteriors of the last call to run
+        self.iterations = None
+        self.d_hats = None
+
+    def run(self, agent, policies):
+        policies = np.asarray(policies, dtype=int)
+        if policies.ndim != 2 or policies.shape[1] != agent.T:
+            raise RuntimeError("In PolicyEvaluation.run, the policies must be an array of shape [K, T].")
+
+        # Sort the policies lexicographically, so that the chunks contain the policies sharing the longest prefixes
+        n_policies = policies.shape[0]
+        order = np.lexsort(policies.T[::-1])
+        cfe = np.zeros(n_policies)
+        self.iterations = np.zeros(n_policies, dtype=int)
+        self.d_hats = np.zeros([n_policies, agent.T + 1, agent.model.n_states]) if self.posteriors else None
+
+        for start in range(0, n_policies, self.chunk_size):
+            chunk = order[start:start + self.chunk_size]
+            cfe[chunk], self.iterations[chunk], d_hats = self.run_chunk(agent, policies[chunk])
+            if self.posteriors:
+                self.d_hats[chunk] = d_hats
+        return cfe
+
+    @staticmethod
+    def prefixes(policies, n_actions):
+        # Index of the prefix of length p of each policy, i.e. two policies have the same index at p if and only if
+        # their first p actions are the same, for p in [0, T]
+        ids = [np.zeros(policies.shape[0], dtype=int)]
+        for p in range(policies.shape[1]):
+            ids.append(np.unique(ids[-1] * n_actions + policies[:, p], return_inverse=True)[1].ravel())
+        return ids
+
+    def run_chunk(self, agent, policies):
+        model = agent.model
+        k, n_states, n_actions = policies.shape[0], model.n_states, model.n_actions
+        prefixes = PolicyEvaluation.prefixes(policies, n_actions)
+        log_p_z = np.array([agent.log_likelihood(tau) for tau in range(agent.T + 1)])
+
+        # Posterior parameters of all the policies, starting from a uniform posterior as a new AgentECFE
+        d_hat = np.full([k, n_states], 1.0 / n_states, dtype=agent.dtype)
+        b_hat = np.full([k, agent.T, n_states, n_actions], 1.0 / n_states, dtype=agent.dtype)
+        log_d_hat = np.log(d_hat) if agent.log_domain else None
+        log_b_hat = np.log(b_hat) if agent.log_domain else None
+        e = np.full([k, agent.T, n_actions], 1.0 / n_actions)
+        one_hot = np.eye(n_actions)[policies]
+
+        # Length of the prefix of the policies on which each factor of the posterior depends
+        d_hat_prefix = 0
+        b_hat_prefix = np.zeros(agent.T, dtype=int)
+        e_prefix = np.zeros(agent.T, dtype=int)
+
+        cfe = np.full(k, float("inf"))
+        iterations = np.zeros(k, dtype=int)
+        active = np.arange(k)
+        while active.size != 0:
+            # Inference of initial hidden state, computed once per group of policies sharing the relevant prefix
+            d_hat_prefix = max(b_hat_prefix[1], e_prefix[0])
+            groups, inverse = PolicyEvaluation.groups(prefixes[d_hat_prefix], active)
+            s = log_p_z[0] + model.log_d
+            s = s + model.log_transition_backward(b_hat[groups, 1] * e[groups, 0, np.newaxis, :])
+            d_hat[active], log_d_hat_active = PolicyEvaluation.normalise(agent, s, inverse)
+            if agent.log_domain:
+                log_d_hat[active] = log_d_hat_active
+
+            # Inference of hidden states (tau > 0), where b_hat[i + 1] is the value of the previous iteration
+            for i in range(agent.T):
+                prefix = d_hat_prefix if i == 0 else max(b_hat_prefix[i - 1], e_prefix[i - 1])
+                if i + 1 != agent.T:
+                    prefix = max(prefix, b_hat_prefix[i + 1], e_prefix[i])
+                groups, inverse = PolicyEvaluation.groups(prefixes[prefix], active)
+                if i == 0:
+                    d_hat_i = d_hat[groups]
+                else:
+                    d_hat_i = np.einsum("ksa,ka->ks", b_hat[groups, i - 1], e[groups, i - 1])
+                s = log_p_z[i + 1][np.newaxis, :, np.newaxis] + model.log_transition_forward(d_hat_i)
+                if i + 1 != agent.T:
+                    future = model.log_transition_backward(b_hat[groups, i + 1] * e[groups, i, np.newaxis, :])
+                    s = s + future[:, :, np.newaxis]
+                b_hat[active, i], log_b_hat_active = PolicyEvaluation.normalise(agent, s, inverse)
+                if agent.log_domain:
+                    log_b_hat[active, i] = log_b_hat_active
+                b_hat_prefix[i] = prefix
+
+            # Pin the posterior over actions to the policies
+            e[active] = one_hot[active]
+            e_prefix = np.arange(1, agent.T + 1)
+            iterations[active] += 1
+
+            # Check convergence of the CFE, and mask out the policies that converged
+            new_cfe = PolicyEvaluation.cfe(
+                agent, log_p_z, d_hat[active], b_hat[active], e[active],
+                None if log_d_hat is None else log_d_hat[active], None if log_b_hat is None else log_b_hat[active]
+            )
+            not_converged = cfe[active] - new_cfe >= agent.epsilon
+            cfe[active] = new_cfe
+            active = active[not_converged]
+
+        d_hats = None
+        if self.posteriors:
+            d_hats = np.concatenate([d_hat[:, np.newaxis], np.einsum("ktsa,kta->kts", b_hat, e)], axis=1)
+        return cfe, iterations, d_hats
+
+    @staticmethod
+    def groups(prefixes, active):
+        # Return one active policy per distinct prefix, and the index of the group of each active policy
+        _, first, inverse = np.unique(prefixes[active], return_index=True, return_inverse=True)
+        return active[first], inverse.ravel()
+
+    @staticmethod
+    def normalise(agent, s, inverse):
+        # Normalise the unnormalised log-probabilities s over the states (as AgentECFE.normalise), and return the
+        # result and its logarithm (log-domain only) for all the active policies
+        if agent.log_domain:
+            log_p = Ops.log_normalise(s, 1)
+            return np.exp(log_p)[inverse], log_p[inverse]
+        return softmax(s, 1)[inverse], None
+
+    @staticmethod
+    def cfe(agent, log_p_z, d_hat, b_hat, e, log_d_hat=None, log_b_hat=None):
+        # Same as AgentECFE.cfe, for a batch of posteriors
+        model = agent.model
+        d_hats = np.concatenate([d_hat[:, np.newaxis], np.einsum("ktsa,kta->kts", b_hat[:, :-1], e[:, :-1])], axis=1)
+
+        # Compute accuracy and expected disappointment
+        fe = - np.einsum("ts,kts->k", log_p_z[:agent.T], d_hats)
+
+        # Compute complexity over initial states
+        log_d_hat = np.log(d_hat) if log_d_hat is None else log_d_hat
+        fe += np.einsum("ks,ks->k", log_d_hat - model.log_d, d_hat)
+
+        # Compute complexity over non-initial states
+        log_b_hat = np.log(b_hat) if log_b_hat is None else log_b_hat
+        diff = log_b_hat - model.log_transition_forward(d_hats)
+        fe += np.einsum("ktsa,ktsa,kta->k", diff, b_hat, e)
+        return fe
@@ -0,0 +1,110 @@
+from scipy.special import softmax
+import numpy as np
+from operators.Operators import Operators as Ops
+
+
+#
+# This class stores the posterior of the CFE agent in contiguous arrays, i.e. Q(S_0) in d_hat, Q(S_tau+1|U_tau)
+# in b_hat[tau] and R(U_tau) in e[tau]. The marginals Q(S_tau) are cached, and the cached value of Q(S_tau) is only
+# invalidated when d_hat (tau = 0), or b_hat[tau - 1] or e[tau - 1] (tau > 0) are modified.
+#
+# When log_domain is True, the logarithms of d_hat and b_hat are stored along with them, i.e. the posterior over
+# hidden states is normalised in log space (using logsumexp instead of softmax), and its logarithm never underflows
+# to -inf as the posterior sharpens. The posterior over hidden states (and the cached marginals) are stored using
+# dtype, e.g. np.float32 halves their memory, while R(U_tau) is always stored in float64 (it is small, and is used
+# as a probability distribution for action selection).
+#
+class Posterior:
+
+    def __init__(self, n_states, n_actions, time_horizon, log_domain=False, dtype=np.float64):
+        # Posterior parameters
+        self.d_hat = np.full([n_states], 1.0 / n_states, dtype=dtype)
+        self.b_hat = np.full([time_horizon, n_states, n_actions], 1.0 / n_states, dtype=dtype)
+        self.e = np.full([time_horizon, n_actions], 1.0 / n_actions)
+
+        # Logarithms of the posterior over hidden states (log-domain only)
+        self.log_domain = log_domain
+        if log_domain:
+            self.log_d_hat = np.log(self.d_hat)
+            self.log_b_hat = np.log(self.b_hat)
+
+        # Cached marginals Q(S_tau) for tau in [0, T], and whether they are up-to-date
+        self.d_hats = np.zeros([time_horizon + 1, n_states], dtype=dtype)
+        self.valid = np.zeros([time_horizon + 1], dtype=bool)
+
+    def set_d_hat(self, d_hat):
+        self.d_hat[...] = d_hat
+        if self.log_domain:
+            self.log_d_hat[...] = Posterior.log(d_hat)
+        self.valid[0] = False
+
+    def set_b_hat(self, tau, b_hat):
+        self.b_hat[tau] = b_hat
+        if self.log_domain:
+            self.log_b_hat[tau] = Posterior.log(b_hat)
+        self.valid[tau + 1] = False
+
+    def set_all_b_hat(self, b_hat):
+        self.b_hat[...] = b_hat
+        if self.log_domain:
+            self.log_b_hat[...] = Posterior.log(b_hat)
+        self.valid[1:] = False
+
+    def update_d_hat(self, s):
+        # Set Q(S_0) to the normalisation of the unnormalised log-probabilities s
+        if self.log_domain:
+            self.log_d_hat[...] = Ops.log_normalise(s, 0)
+            self.d_hat[...] = np.exp(self.log_d_hat)
+        else:
+            self.d_hat[...] = softmax(s, 0)
+        self.valid[0] = False
+
+    def update_b_hat(self, tau, s):
+        # Set Q(S_tau+1|U_tau) to the normalisation (over S_tau+1) of the unnormalised log-probabilities s
+        if self.log_domain:
+            self.log_b_hat[tau] = Ops.log_normalise(s, 0)
+            self.b_hat[tau] = np.exp(self.log_b_hat[tau])
+        else:
+            self.b_hat[tau] = softmax(s, 0)
+        self.valid[tau + 1] = False
+
+    def get_log_d_hat(self):
+        return self.log_d_hat if self.log_domain else np.log(self.d_hat)
+
+    def get_log_b_hat(self, tau=None):
+        # Return log Q(S_tau+1|U_tau), or the logarithm of the whole b_hat if tau is None
+        b_hat = self.b_hat if tau is None else self.b_hat[tau]
+        if not self.log_domain:
+            return np.log(b_hat)
+        return self.log_b_hat if tau is None else self.log_b_hat[tau]
+
+    @staticmethod
+    def log(x):
+        # The logarithm of probabilities that were not computed in log space, where zeros are clipped
+        x = np.asarray(x)
+        return np.log(np.maximum(x, np.finfo(x.dtype).tiny))
+
+    def set_e(self, tau, e):
+        self.e[tau] = e
+        self.valid[tau + 1] = False
+
+    def set_all_e(self, e):
+        changed = np.any(self.e != e, axis=1)
+        self.e[...] = e
+        self.valid[1:][changed] = False
+
+    def get_d_hat(self, tau):
+        if not self.valid[tau]:
+            self.d_hats[tau] = self.d_hat if tau == 0 else np.matmul(self.b_hat[tau - 1], self.e[tau - 1])
+            self.valid[tau] = True
+        return self.d_hats[tau]
+
+    def get_d_hats(self):
+        # Update all the invalid marginals at once, and return Q(S_tau) for all tau in [0, T]
+        if not self.valid[0]:
+            self.get_d_hat(0)
+        invalid = np.flatnonzero(~self.valid[1:])
+        if invalid.size != 0:
+            self.d_hats[invalid + 1] = np.einsum("tsa,ta->ts", self.b_hat[invalid], self.e[invalid])
+            self.valid[invalid + 1] = True
+        return self.d_hats
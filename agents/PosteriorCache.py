@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+
+#
+# This class is a node of the prefix tree of PosteriorCache, i.e. it corresponds to a sequence of observations.
+#
+class PosteriorCacheNode:
+
+    def __init__(self, parent=None, obs=None):
+        self.parent = parent
+        self.obs = obs
+        self.children = {}
+        self.value = None
+
+
+#
+# This class caches the converged posteriors of the CFE agents, indexed by the model and the sequence of
+# observations received so far. Since the environment and the initial posterior are deterministic, the posterior
+# after inference only depends on these two, so agents receiving a sequence of observations already seen can skip
+# inference. A cache must only be shared by agents having the same parameters (time horizon, solvers, etc.).
+#
+# The sequences of observations are stored in a prefix tree (one per model), and at most max_entries posteriors
+# are kept, i.e. the least recently used posterior is evicted when the cache is full.
+#
+class PosteriorCache:
+
+    def __init__(self, max_entries=10000):
+        # Sanity check
+        if max_entries < 1:
+            raise RuntimeError("In PosteriorCache, the maximum number of entries must be at least one.")
+
+        # Prefix trees indexed by model, and nodes storing a posterior from the least to the most recently used
+        self.max_entries = max_entries
+        self.roots = {}
+        self.lru = OrderedDict()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, observations):
+        node = self.find(model, observations, create=False)
+        if node is None or node.value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.lru.move_to_end(node)
+        return node.value
+
+    def put(self, model, observations, value):
+        node = self.find(model, observations, create=True)
+        node.value = value
+        self.lru[node] = None
+        self.lru.move_to_end(node)
+
+        # Evict the least recently used posteriors
+        while len(self.lru) > self.max_entries:
+            evicted, _ = self.lru.popitem(last=False)
+            evicted.value = None
+            PosteriorCache.prune(evicted)
+
+    def find(self, model, observations, create):
+        if model not in self.roots:
+            if not create:
+                return None
+            self.roots[model] = PosteriorCacheNode()
+        node = self.roots[model]
+        for obs in observations:
+            if obs not in node.children:
+                if not create:
+                    return None
+                node.children[obs] = PosteriorCacheNode(node, obs)
+            node = node.children[obs]
+        return node
+
+    @staticmethod
+    def prune(node):
+        # Remove the nodes that store neither a posterior nor children
+        while node.parent is not None and node.value is None and len(node.children) == 0:
+            del node.parent.children[node.obs]
+            node = node.parent
+
+    def __len__(self):
+        return len(self.lru)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return 0 if total == 0 else self.hits / total
@@ -0,0 +1,71 @@
+#
+# This script benchmarks the agents and environments on the shipped mazes and on generated mazes of growing size,
+# and compares the results against a stored baseline, e.g.
+#   python benchmark.py --sizes 9 15 21 --agents cfe ecfe
+#   python benchmark.py --save-baseline
+# or reports the accuracy of the numerics modes of the agents (log-domain, float32) against the float64 path, e.g.
+#   python benchmark.py --numerics --noise 0.01 0.000001
+#
+
+import argparse
+import os
+import sys
+import tempfile
+from experiments.Configurations import Configurations as Configs
+from benchmarks.Benchmark import Benchmark
+from benchmarks.NumericsReport import NumericsReport
+from environments.MazeGenerator import MazeGenerator
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the agents and environments.")
+    parser.add_argument("--mazes", type=int, nargs="*", default=Configs.mazes, help="the shipped mazes to use")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[9, 15, 21], help="the sizes of the generated mazes")
+    parser.add_argument("--maze-seed", type=int, default=0, help="the seed of the generated mazes")
+    parser.add_argument("--agents", nargs="+", default=list(Benchmark.agents.keys()), help="the agents to benchmark")
+    parser.add_argument("--episodes", type=int, default=5, help="the number of episodes per maze and agent")
+    parser.add_argument("--cycles", type=int, default=30, help="the number of action-perception cycles")
+    parser.add_argument("--repeats", type=int, default=3, help="the number of timed repeats of each benchmark")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json", help="the baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="the tolerated throughput drop")
+    parser.add_argument("--numerics", action="store_true", help="report the accuracy of the numerics modes instead")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.01], help="the noise levels of the report")
+    args = parser.parse_args()
+    for agent in args.agents:
+        if agent not in Benchmark.agents:
+            parser.error("unknown agent " + agent + ", choose among " + str(list(Benchmark.agents.keys())))
+    return args
+
+
+if __name__ == '__main__':
+
+    args = parse_arguments()
+    benchmark = Benchmark(args.agents, n_episodes=args.episodes, ap_cycles=args.cycles, repeats=args.repeats)
+
+    with tempfile.TemporaryDirectory(prefix="mazes_") as directory:
+        # Gather the shipped mazes, and generate the mazes of growing size.
+        maze_file_names = ["./data/mazes/" + str(maze) + ".maze" for maze in args.mazes]
+        for size in args.sizes:
+            maze_file_names.append(os.path.join(directory, "generated_" + str(size) + ".maze"))
+            MazeGenerator(size, size, seed=args.maze_seed).write(maze_file_names[-1])
+
+        # Report the accuracy of the numerics modes, or run the benchmarks.
+        if args.numerics:
+            for noise in args.noise:
+                report = NumericsReport(args.agents, n_episodes=args.episodes, ap_cycles=args.cycles, noise=noise)
+                sys.stdout.write("Noise: " + str(noise) + "\n")
+                NumericsReport.print(sys.stdout, report.run(maze_file_names))
+            sys.exit(0)
+        results = benchmark.run(maze_file_names)
+
+    # Compare the results against the baseline, or replace the baseline.
+    baseline = Benchmark.load(args.baseline) if os.path.exists(args.baseline) else None
+    Benchmark.print(sys.stdout, results, None if args.save_baseline else baseline)
+    if args.save_baseline:
+        Benchmark.save(args.baseline, results)
+    elif baseline is not None:
+        regressions = Benchmark.compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        sys.exit(1 if len(regressions) != 0 else 0)
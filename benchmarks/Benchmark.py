@@ -0,0 +1,141 @@
+import gc
+import json
+import os
+import time
+import tracemalloc
+import numpy as np
+from environments.MazeEnv import MazeEnv
+from environments.MazeModel import MazeModel
+from agents.AgentCFE import AgentCFE
+from agents.AgentECFE import AgentCFE as AgentECFE
+from experiments.EpisodeRunner import EpisodeRunner
+from experiments.StopConditions import StopConditions
+
+
+#
+# This class measures the performance of the agents and environments on a list of mazes, i.e. for each maze:
+#  - "model" is the construction of MazeEnv.a() and MazeEnv.b();
+#  - "inference/<agent>" is the first call to inference() of a new agent;
+#  - "episodes/<agent>" is a run of full episodes, whose accuracy is the fraction of episodes reaching the exit, and
+#    whose distance is the average Manhattan distance between the final position of the agent and the exit.
+# Each benchmark reports its throughput (i.e. number of operations per second, using the median of several repeats,
+# where each repeat calls the benchmarked function until it ran for at least min_time seconds)
+# and its peak memory (measured in a separate run, because tracemalloc slows down the execution). The results can be
+# saved as a baseline, and later results are compared against it, i.e. a benchmark fails if its throughput dropped by
+# more than the tolerance, or if its accuracy or distance changed.
+#
+class Benchmark:
+
+    # The agents that can be benchmarked.
+    agents = {"cfe": AgentCFE, "ecfe": AgentECFE}
+
+    def __init__(self, agents=None, n_episodes=5, ap_cycles=30, repeats=3, min_time=0.2, seed=0):
+        self.agents = list(Benchmark.agents.keys()) if agents is None else agents
+        self.n_episodes = n_episodes
+        self.action_perception_cycles = ap_cycles
+        self.repeats = repeats
+        self.min_time = min_time
+        self.seed = seed
+
+        # Accuracy and distance of the last run of episodes
+        self.accuracy = 0
+        self.distance = 0
+
+    def run(self, maze_file_names):
+        # Run all the benchmarks on each maze, and return the results indexed by "<maze>/<benchmark>".
+        results = {}
+        for maze_file_name in maze_file_names:
+            maze = os.path.basename(maze_file_name)
+            env = MazeEnv(maze_file_name)
+            model = MazeModel(env, sparse=True)
+            results[maze + "/model"] = self.measure(lambda: (env.a(), env.b()), 1)
+            for agent in self.agents:
+                agent_class = Benchmark.agents[agent]
+                results[maze + "/inference/" + agent] = self.measure(
+                    lambda: Benchmark.new_agent(agent_class, env, model, self.action_perception_cycles).inference(), 1
+                )
+                results[maze + "/episodes/" + agent] = self.measure(
+                    lambda: self.run_episodes(agent_class, env, model), self.n_episodes
+                )
+                results[maze + "/episodes/" + agent]["accuracy"] = self.accuracy
+                results[maze + "/episodes/" + agent]["distance"] = self.distance
+        return results
+
+    def measure(self, function, n_operations):
+        # Measure the throughput and peak memory of a function performing n_operations operations.
+        throughputs = []
+        for k in range(self.repeats):
+            gc.collect()
+            calls = 0
+            start = time.perf_counter()
+            while calls == 0 or time.perf_counter() - start < self.min_time:
+                function()
+                calls += 1
+            throughputs.append(calls * n_operations / (time.perf_counter() - start))
+        gc.collect()
+        tracemalloc.start()
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {"throughput": float(np.median(throughputs)), "peak_memory": peak_memory}
+
+    @staticmethod
+    def new_agent(agent_class, env, model, time_horizon, rng=None):
+        o0 = env.reset()
+        return agent_class(env, o0, time_horizon=time_horizon, model=model, rng=rng)
+
+    def run_episodes(self, agent_class, env, model):
+        # Run the episodes, and store the fraction of episodes reaching the exit in self.accuracy.
+        solved = 0
+        distance = 0
+        for j in range(self.n_episodes):
+            rng = EpisodeRunner.create_rng(self.seed, j)
+            agent = Benchmark.new_agent(agent_class, env, model, self.action_perception_cycles, rng)
+            for k in range(self.action_perception_cycles):
+                agent.step(env)
+                if StopConditions.solved(env.agent_position(), env.exit_position()):
+                    solved += 1
+                    break
+            distance += MazeEnv.manhattan_distance(env.agent_position(), env.exit_position())
+        self.accuracy = solved / self.n_episodes
+        self.distance = distance / self.n_episodes
+
+    @staticmethod
+    def compare(results, baseline, tolerance=0.2):
+        # Return the list of regressions, i.e. the benchmarks that became slower or whose accuracy or distance changed.
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            reference = baseline[name]
+            if result["throughput"] < (1 - tolerance) * reference["throughput"]:
+                regressions.append(name + ": throughput dropped from " + str(reference["throughput"]) + "/s to "
+                                   + str(result["throughput"]) + "/s")
+            for check in ["accuracy", "distance"]:
+                if check in reference and result.get(check) != reference[check]:
+                    regressions.append(name + ": " + check + " changed from " + str(reference[check]) + " to "
+                                       + str(result.get(check)))
+        return regressions
+
+    @staticmethod
+    def print(file, results, baseline=None):
+        file.write("========== BENCHMARK ==========\n")
+        for name, result in results.items():
+            line = name + ": " + "{:.2f}".format(result["throughput"]) + "/s, peak memory "
+            line += "{:.1f}".format(result["peak_memory"] / 1024) + " KiB"
+            if "accuracy" in result:
+                line += ", accuracy " + str(result["accuracy"]) + ", distance " + str(result["distance"])
+            if baseline is not None and name in baseline:
+                line += " (x" + "{:.2f}".format(result["throughput"] / baseline[name]["throughput"]) + " baseline)"
+            file.write(line + "\n")
+        file.write("\n")
+
+    @staticmethod
+    def load(file_name):
+        with open(file_name, "r") as file:
+            return json.load(file)
+
+    @staticmethod
+    def save(file_name, results):
+        with open(file_name, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
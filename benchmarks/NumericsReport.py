@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from environments.MazeEnv import MazeEnv
+from environments.MazeModel import MazeModel
+from agents.AgentCFE import AgentCFE
+from agents.AgentECFE import AgentCFE as AgentECFE
+from experiments.EpisodeRunner import EpisodeRunner
+
+
+#
+# This class reports the accuracy of the numerics modes of the agents (i.e. log_domain and dtype) against the float64
+# path. For each maze, agent and mode, the episodes are run with the same random number generators as the float64
+# path, and the report gives:
+#  - "cfe", the largest relative difference between the CFE after each inference and the one of the float64 path;
+#  - "posterior", the largest absolute difference between the marginal posteriors over hidden states Q(S_tau);
+#  - "trajectories", the fraction of episodes in which the agent went through the same positions;
+#  - "non-finite", the number of inferences whose CFE is not finite (e.g. because the posterior underflowed);
+#  - "memory", the memory used by the posterior over hidden states and the log-likelihoods of the evidence,
+#    relative to the float64 path.
+# The differences are only measured until the trajectory of the agent diverges from the one of the float64 path.
+#
+class NumericsReport:
+
+    # The agents whose numerics are compared.
+    agents = {"cfe": AgentCFE, "ecfe": AgentECFE}
+
+    # The numerics modes, i.e. (log_domain, dtype), where the first one is the reference.
+    modes = {
+        "float64": (False, np.float64),
+        "log-float64": (True, np.float64),
+        "float32": (False, np.float32),
+        "log-float32": (True, np.float32)
+    }
+
+    def __init__(self, agents=None, n_episodes=3, ap_cycles=30, noise=0.01, seed=0):
+        self.agents = list(NumericsReport.agents.keys()) if agents is None else agents
+        self.n_episodes = n_episodes
+        self.action_perception_cycles = ap_cycles
+        self.noise = noise
+        self.seed = seed
+
+    def run(self, maze_file_names):
+        # Compare all the modes on each maze, and return the results indexed by "<maze>/<agent>/<mode>".
+        results = {}
+        for maze_file_name in maze_file_names:
+            maze = os.path.basename(maze_file_name)
+            env = MazeEnv(maze_file_name, self.noise)
+            model = MazeModel(env, sparse=True)
+            for agent in self.agents:
+                agent_class = NumericsReport.agents[agent]
+                references = [self.run_episode(agent_class, env, model, "float64", j) for j in range(self.n_episodes)]
+                for mode in NumericsReport.modes:
+                    episodes = [self.run_episode(agent_class, env, model, mode, j) for j in range(self.n_episodes)]
+                    results[maze + "/" + agent + "/" + mode] = NumericsReport.compare(episodes, references)
+        return results
+
+    def run_episode(self, agent_class, env, model, mode, episode):
+        # Return the CFE, posterior over hidden states and position of the agent at each action-perception cycle,
+        # along with the memory used by the posterior.
+        log_domain, dtype = NumericsReport.modes[mode]
+        rng = EpisodeRunner.create_rng(self.seed, episode)
+        agent = agent_class(
+            env, env.reset(), time_horizon=self.action_perception_cycles, model=model, rng=rng,
+            log_domain=log_domain, dtype=dtype
+        )
+        trace = []
+        for k in range(self.action_perception_cycles):
+            agent.inference()
+            cfe = float(agent.cfe())
+            d_hats = np.einsum("tsa,ta->ts", np.array(agent.b_hat, dtype=np.float64), np.array(agent.e))
+            obs = env.execute(agent.action_selection())
+            agent.observe(obs)
+            trace.append((cfe, d_hats, tuple(env.agent_position())))
+        return trace, NumericsReport.memory(agent)
+
+    @staticmethod
+    def memory(agent):
+        # The number of bytes of the posterior over hidden states (and of its logarithm in the log-domain), and of
+        # the log-likelihoods of the evidence
+        posterior = getattr(agent, "posterior", agent)
+        arrays = [posterior.d_hat, posterior.b_hat]
+        if posterior.log_domain:
+            arrays += [posterior.log_d_hat, posterior.log_b_hat]
+        arrays += [agent.log_p_z] if hasattr(agent, "log_p_z") else agent.log_p_o + [agent.log_p_c]
+        return sum(np.asarray(x).nbytes for x in arrays)
+
+    @staticmethod
+    def compare(episodes, references):
+        cfe_error = 0.0
+        posterior_error = 0.0
+        same_trajectories = 0
+        non_finite = 0
+        for (trace, _), (reference, _) in zip(episodes, references):
+            for (cfe, d_hats, pos), (ref_cfe, ref_d_hats, ref_pos) in zip(trace, reference):
+                non_finite += not np.isfinite(cfe)
+                if np.isfinite(cfe) and np.isfinite(ref_cfe):
+                    cfe_error = max(cfe_error, abs(cfe - ref_cfe) / max(abs(ref_cfe), 1.0))
+                posterior_error = max(posterior_error, float(np.abs(d_hats - ref_d_hats).max()))
+                if pos != ref_pos:
+                    break
+            same_trajectories += [step[2] for step in trace] == [step[2] for step in reference]
+        return {
+            "cfe": cfe_error,
+            "posterior": posterior_error,
+            "trajectories": same_trajectories / len(episodes),
+            "non-finite": non_finite,
+            "memory": episodes[0][1] / references[0][1]
+        }
+
+    @staticmethod
+    def print(file, results):
+        file.write("========== NUMERICS ==========\n")
+        for name, result in results.items():
+            line = name + ": cfe error " + "{:.2e}".format(result["cfe"]) + ", posterior error "
+            line += "{:.2e}".format(result["posterior"]) + ", same trajectories " + str(result["trajectories"])
+            line += ", non-finite " + str(result["non-finite"]) + ", memory x" + "{:.2f}".format(result["memory"])
+            file.write(line + "\n")
+        file.write("\n")
@@ -0,0 +1,22 @@
+#
+# This script validates maze files and compiles the valid ones into a single bundle, which can then be used by the
+# experiments instead of the maze files, e.g.
+#   python compile_mazes.py ./data/mazes --output ./data/mazes.npz
+#
+
+import argparse
+from environments.MazeRegistry import MazeRegistry
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Compile maze files into a bundle.")
+    parser.add_argument("sources", nargs="+", help="the maze files, or the directories containing them")
+    parser.add_argument("--output", required=True, help="the file in which the bundle is written")
+    args = parser.parse_args()
+
+    rejected = MazeRegistry.compile(args.sources, args.output)
+    registry = MazeRegistry(args.output)
+    print("Compiled " + str(len(registry)) + " mazes: " + ", ".join(registry.names))
+    for name, reason in rejected:
+        print("Rejected maze " + name + ": " + reason)
@@ -0,0 +1,4 @@
+#
+# This file makes pytest add the root of the repository to sys.path, so that the tests can import the packages
+# (agents, environments, experiments, operators) when running pytest from the repository root.
+#
@@ -7,49 +7,73 @@ from environments.MazeEnvAction import MazeEnvAction
 #
 class MazeEnv:
 
-    def __init__(self, maze_file_name):
-        # Set amount of noise
-        self.noise = 0.01
+    def __init__(self, maze_file_name, noise=0.01):
+        # Open maze file, and load its content.
+        with open(maze_file_name, "r") as file:
+            self.load(file.readlines(), noise, maze_file_name)
 
-        # Open maze file.
-        file = open(maze_file_name, "r")
+    @staticmethod
+    def from_array(maze, noise=0.01):
+        # Create the environment from an array of characters using the format of the maze files, e.g. 'W' for walls.
+        maze = np.asarray(maze)
+        lines = [str(maze.shape[0]) + " " + str(maze.shape[1]) + "\n"] + ["".join(row) + "\n" for row in maze]
+        env = MazeEnv.__new__(MazeEnv)
+        env.load(lines, noise, "<array>")
+        return env
 
-        # Load maze's size.
-        self.maze_size = [int(i) for i in file.readline().split(" ")]
-        if len(self.maze_size) != 2:
-            raise RuntimeError("Incorrect maze file format: " + maze_file_name + ".")
+    @staticmethod
+    def from_grid(walls, agent_pos, exit_pos, noise=0.01):
+        # Create the environment from an array that is non-zero for walls, and the initial agent and exit positions.
+        env = MazeEnv.__new__(MazeEnv)
+        env.load_grid(walls, agent_pos, exit_pos, noise)
+        return env
+
+    def load(self, lines, noise, maze_file_name):
+        walls, agent_pos, exit_pos = MazeEnv.parse(lines, maze_file_name)
+        self.load_grid(walls, agent_pos, exit_pos, noise)
 
-        # Initialise attributes
-        self.agent_pos = [-1, -1]
-        self.exit_pos = [-1, -1]
-        self.nb_states = 0
-        self.maze = np.empty([self.maze_size[0], self.maze_size[1]])
+    @staticmethod
+    def parse(lines, maze_file_name):
+        # Check the whole content of a maze file before loading it, and return the walls (i.e. an array of booleans),
+        # and the initial positions of the agent and exit. Incomplete lines are completed with walls.
+        def error(reason):
+            return RuntimeError("Incorrect maze file format: " + maze_file_name + " (" + reason + ").")
+
+        # Load maze's size.
+        size = lines[0].split() if len(lines) != 0 else []
+        if len(size) != 2 or not all(x.isdigit() for x in size):
+            raise error("the first line must contain the height and width of the maze")
+        height, width = int(size[0]), int(size[1])
+        if height + width - 5 < 2:
+            raise error("the maze must have at least two possible observations, i.e. height + width >= 7")
 
         # Load maze's content.
-        for i in range(self.maze_size[0]):
-            # Load next line in file.
-            line = file.readline()
-            for j in range(min(len(line), self.maze_size[1])):
-                if line[j] == 'W':
-                    self.maze[i][j] = 1
-                elif line[j] == '.':
-                    self.nb_states += 1
-                    self.maze[i][j] = 0
-                elif line[j] == 'E':
-                    self.nb_states += 1
-                    self.maze[i][j] = 0
-                    self.exit_pos[0] = i
-                    self.exit_pos[1] = j
-                elif line[j] == 'S':
-                    self.nb_states += 1
-                    self.maze[i][j] = 0
-                    self.agent_pos[0] = i
-                    self.agent_pos[1] = j
-                else:
-                    raise RuntimeError("Incorrect maze file format: " + maze_file_name + ".")
-            # Add walls for incomplete lines.
-            for j in range(len(line), self.maze_size[1]):
-                self.maze[i][j] = 1
+        maze = np.full([height, width], "W")
+        for i, line in enumerate(lines[1:height + 1]):
+            line = line.rstrip("\r\n")[:width]
+            maze[i, :len(line)] = list(line)
+        invalid = np.argwhere(~np.isin(maze, ["W", ".", "S", "E"]))
+        if invalid.size != 0:
+            i, j = invalid[0]
+            raise error("invalid character '" + maze[i, j] + "' at line " + str(i + 2) + ", column " + str(j + 1))
+
+        # Check the initial positions of the agent and exit.
+        for char, name in [("S", "agent"), ("E", "exit")]:
+            count = np.count_nonzero(maze == char)
+            if count != 1:
+                raise error("expected one " + name + " position '" + char + "', found " + str(count))
+        return maze == "W", np.argwhere(maze == "S")[0].tolist(), np.argwhere(maze == "E")[0].tolist()
+
+    def load_grid(self, walls, agent_pos, exit_pos, noise):
+        # Set amount of noise
+        self.noise = noise
+
+        # Load maze's size and content.
+        self.maze = (np.asarray(walls) != 0).astype(float)
+        self.maze_size = list(self.maze.shape)
+        self.nb_states = int(np.count_nonzero(self.maze == 0))
+        self.agent_pos = [int(x) for x in agent_pos]
+        self.exit_pos = [int(x) for x in exit_pos]
 
         # Remember the initial position of the agent.
         self.agent_initial_pos = self.agent_pos.copy()
@@ -57,58 +81,78 @@ class MazeEnv:
         # Load state indices.
         self.states_ids = self.load_states_indices()
 
+        # Create the lookup tables, i.e. position and observation of each state, and next state of each state-action.
+        self.states_pos = np.argwhere(self.states_ids >= 0)
+        self.states_obs = np.abs(self.states_pos - np.array(self.exit_pos)).sum(axis=1)
+        self.next_states = self.load_next_states()
+
     def load_states_indices(self):
-        state_id = 0
+        # States are numbered row by row, i.e. in the order of the empty cells in the flattened maze.
         states_ids = np.full(self.maze.shape, -1)
-
-        for j in range(self.maze.shape[0]):
-            for i in range(self.maze.shape[1]):
-                if self.maze[j][i] == 0:
-                    states_ids[j][i] = state_id
-                    state_id += 1
+        states_ids[self.maze == 0] = np.arange(np.count_nonzero(self.maze == 0))
         return states_ids
 
+    def load_next_states(self):
+        next_states = np.zeros([self.states(), self.actions()], dtype=int)
+        moves = {
+            MazeEnvAction.UP: [-1, 0],
+            MazeEnvAction.DOWN: [1, 0],
+            MazeEnvAction.LEFT: [0, -1],
+            MazeEnvAction.RIGHT: [0, 1],
+            MazeEnvAction.IDLE: [0, 0]
+        }
+
+        for action, move in moves.items():
+            # Compute the target positions, and check whether they are inside the maze and not walls.
+            pos = self.states_pos + np.array(move)
+            valid = np.all((pos >= 0) & (pos < np.array(self.maze.shape)), axis=1)
+            valid[valid] = self.maze[pos[valid, 0], pos[valid, 1]] == 0
+
+            # Stay in the same state when the move is not possible.
+            next_states[:, action] = np.arange(self.states())
+            next_states[valid, action] = self.states_ids[pos[valid, 0], pos[valid, 1]]
+        return next_states
+
     def reset(self):
         self.agent_pos = self.agent_initial_pos.copy()
         return self.execute(MazeEnvAction.IDLE)
 
     def execute(self, action):
-        self.agent_pos = self.execute_in_position(action, self.agent_pos)
-        return MazeEnv.manhattan_distance(self.agent_pos, self.exit_pos)
-
-    def execute_in_position(self, action, pos):
-        res = pos.copy()
-        if action == MazeEnvAction.UP:
-            if res[0] - 1 >= 0 and self.maze[res[0] - 1][res[1]] == 0:
-                res[0] -= 1
-        elif action == MazeEnvAction.DOWN:
-            if res[0] + 1 < self.maze.shape[0] and self.maze[res[0] + 1][res[1]] == 0:
-                res[0] += 1
-        elif action == MazeEnvAction.LEFT:
-            if res[1] - 1 >= 0 and self.maze[res[0]][res[1] - 1] == 0:
-                res[1] -= 1
-        elif action == MazeEnvAction.RIGHT:
-            if res[1] + 1 < self.maze.shape[1] and self.maze[res[0]][res[1] + 1] == 0:
-                res[1] += 1
-        elif action != MazeEnvAction.IDLE:
+        if not 0 <= action < self.actions():
             raise RuntimeError("Invalid action was sent to MazeEnv.execute.")
-        return res
+        next_state = self.next_states[self.agent_state()][action]
+        self.agent_pos = self.states_pos[next_state].tolist()
+        return int(self.states_obs[next_state])
+
+    def step(self, states, actions):
+        # Execute many actions at once, i.e. states and actions are arrays of state indices and actions.
+        next_states = self.next_states[states, actions]
+        return next_states, self.states_obs[next_states]
+
+    def agent_state(self):
+        return self.states_ids[self.agent_pos[0]][self.agent_pos[1]]
 
     def print(self):
+        print(self.render(), end="")
+
+    def render(self, agent_pos=None):
+        # Return the maze as a string, where the agent is at agent_pos (at its current position if None).
+        agent_pos = self.agent_pos if agent_pos is None else agent_pos
+        lines = []
         for i in range(self.maze.shape[0]):
+            line = ""
             for j in range(0, self.maze.shape[1]):
-                if self.agent_pos[0] == i and self.agent_pos[1] == j:
-                    print("A", end="")
+                if agent_pos[0] == i and agent_pos[1] == j:
+                    line += "A"
                 elif self.exit_pos[0] == i and self.exit_pos[1] == j:
-                    print("E", end="")
+                    line += "E"
                 elif self.maze[i][j] == 0:
-                    print(" ", end="")
+                    line += " "
                 else:
-                    print("W", end="")
-            print()
-        print("A = agent position")
-        print("E = exit position")
-        print("W = wall")
+                    line += "W"
+            lines.append(line)
+        lines += ["A = agent position", "E = exit position", "W = wall"]
+        return "\n".join(lines) + "\n"
 
     def agent_position(self):
         return self.agent_pos
@@ -118,29 +162,17 @@ class MazeEnv:
 
     def a(self):
         a_mat = np.full([self.observations(), self.states()], self.noise / (self.observations() - 1))
-
-        for i in range(self.maze.shape[1]):
-            for j in range(self.maze.shape[0]):
-                if self.maze[j][i] == 0:
-                    dist = self.manhattan_distance([j, i], self.exit_pos)
-                    a_mat[dist][self.states_ids[j][i]] = 1 - self.noise
+        a_mat[self.states_obs, np.arange(self.states())] = 1 - self.noise
         return a_mat
 
     def b(self):
         b_mat = np.full([self.states(), self.states(), self.actions()], self.noise / (self.states() - 1))
-
-        for i in range(self.maze.shape[1]):
-            for j in range(self.maze.shape[0]):
-                if self.maze[j][i] == 0:
-                    current_pos = [j, i]
-                    for k in range(self.actions()):
-                        pos = self.execute_in_position(k, current_pos)
-                        b_mat[self.states_ids[pos[0]][pos[1]]][self.states_ids[j][i]][k] = 1 - self.noise
+        b_mat[self.next_states, np.arange(self.states())[:, np.newaxis], np.arange(self.actions())] = 1 - self.noise
         return b_mat
 
     def d(self):
         d_mat = np.full([self.states()], self.noise / (self.states() - 1))
-        d_mat[self.states_ids[self.agent_pos[0]][self.agent_pos[1]]] = 1 - self.noise
+        d_mat[self.agent_state()] = 1 - self.noise
         return d_mat
 
     @staticmethod
@@ -153,6 +185,12 @@ class MazeEnv:
     def observations(self):
         return self.maze.shape[0] + self.maze.shape[1] - 5
 
+    def local_minima(self):
+        # Return the positions (other than the exit) from which no action decreases the distance to the exit.
+        next_obs = self.states_obs[self.next_states]
+        minima = np.all(next_obs >= self.states_obs[:, np.newaxis], axis=1) & (self.states_obs != 0)
+        return self.states_pos[minima].tolist()
+
     @staticmethod
     def manhattan_distance(p1, p2):
         return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
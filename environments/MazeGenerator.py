@@ -0,0 +1,122 @@
+import numpy as np
+from environments.MazeEnv import MazeEnv
+
+
+#
+# This class generates random mazes in the format of the maze files, i.e. arrays of characters where 'W' is a wall,
+# '.' is an empty cell, 'S' is the initial position of the agent and 'E' is the exit. The mazes are generated from
+# the seed only, i.e. the same parameters always give the same maze:
+#  - a perfect maze (i.e. exactly one path between any two cells) is carved by a randomised depth-first search;
+#  - a fraction density of the remaining inner walls is removed, creating loops and wider corridors;
+#  - dead ends are opened until at most dead_ends remain (None to keep all the dead ends).
+# The agent starts in the top-left corner, and the exit is the cell that is the farthest from the agent.
+#
+class MazeGenerator:
+
+    def __init__(self, height, width, density=0.0, dead_ends=None, seed=0):
+        # Sanity check
+        if height < 5 or width < 5 or height % 2 == 0 or width % 2 == 0:
+            raise RuntimeError("In MazeGenerator, the height and width must be odd numbers greater than four.")
+        if not 0 <= density <= 1:
+            raise RuntimeError("In MazeGenerator, the corridor density must be in [0, 1].")
+        if dead_ends is not None and dead_ends < 0:
+            raise RuntimeError("In MazeGenerator, the number of dead ends must be positive.")
+
+        # Parameters of the generated mazes
+        self.height = height
+        self.width = width
+        self.density = density
+        self.dead_ends = dead_ends
+        self.seed = seed
+
+    def generate(self):
+        rng = np.random.default_rng(self.seed)
+        maze = np.full([self.height, self.width], "W")
+
+        # Carve a perfect maze, where the cells have odd coordinates and the walls between them even ones
+        self.carve(maze, rng)
+
+        # Remove a fraction of the inner walls separating two cells
+        walls = [pos for pos in self.inner_walls() if maze[pos] == "W"]
+        for k in rng.permutation(len(walls))[:int(round(self.density * len(walls)))]:
+            maze[walls[k]] = "."
+
+        # Open the dead ends exceeding the requested number
+        if self.dead_ends is not None:
+            self.open_dead_ends(maze, rng)
+
+        # Place the agent and the exit
+        maze[1, 1] = "S"
+        maze[self.farthest_cell(maze, (1, 1))] = "E"
+        return maze
+
+    def carve(self, maze, rng):
+        # Randomised depth-first search over the cells
+        maze[1, 1] = "."
+        stack = [(1, 1)]
+        while len(stack) != 0:
+            i, j = stack[-1]
+            neighbours = [
+                (i + di, j + dj) for di, dj in [(-2, 0), (2, 0), (0, -2), (0, 2)]
+                if 0 < i + di < self.height - 1 and 0 < j + dj < self.width - 1 and maze[i + di, j + dj] == "W"
+            ]
+            if len(neighbours) == 0:
+                stack.pop()
+                continue
+            ni, nj = neighbours[rng.integers(len(neighbours))]
+            maze[(i + ni) // 2, (j + nj) // 2] = "."
+            maze[ni, nj] = "."
+            stack.append((ni, nj))
+
+    def inner_walls(self):
+        # The walls between two horizontally or vertically adjacent cells
+        walls = [(i, j) for i in range(1, self.height - 1, 2) for j in range(2, self.width - 2, 2)]
+        walls += [(i, j) for i in range(2, self.height - 2, 2) for j in range(1, self.width - 1, 2)]
+        return walls
+
+    def find_dead_ends(self, maze):
+        # The cells having a single empty neighbour
+        return [
+            (i, j) for i in range(1, self.height - 1, 2) for j in range(1, self.width - 1, 2)
+            if sum(maze[i + di, j + dj] != "W" for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]) == 1
+        ]
+
+    def open_dead_ends(self, maze, rng):
+        dead_ends = set(self.find_dead_ends(maze))
+        while len(dead_ends) > self.dead_ends:
+            # Remove a wall between a random dead end and one of its neighbouring cells, i.e. both cells are no
+            # longer dead ends, and no other cell is affected
+            i, j = sorted(dead_ends)[rng.integers(len(dead_ends))]
+            moves = [
+                (di, dj) for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                if 0 < i + 2 * di < self.height - 1 and 0 < j + 2 * dj < self.width - 1 and maze[i + di, j + dj] == "W"
+            ]
+            di, dj = moves[rng.integers(len(moves))]
+            maze[i + di, j + dj] = "."
+            dead_ends -= {(i, j), (i + 2 * di, j + 2 * dj)}
+
+    @staticmethod
+    def farthest_cell(maze, start):
+        # Breadth-first search from the start, returning the last empty cell reached
+        distances = {start: 0}
+        queue = [start]
+        for i, j in queue:
+            for di, dj in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                pos = (i + di, j + dj)
+                if maze[pos] != "W" and pos not in distances:
+                    distances[pos] = distances[(i, j)] + 1
+                    queue.append(pos)
+        return queue[-1]
+
+    def write(self, file_name):
+        # Write the maze in the format of the maze files
+        maze = self.generate()
+        with open(file_name, "w") as file:
+            file.write(str(self.height) + " " + str(self.width) + "\n")
+            file.write("\n".join("".join(row) for row in maze))
+
+    def env(self, noise=0.01):
+        return MazeEnv.from_array(self.generate(), noise)
+
+    def local_minima(self):
+        return self.env().local_minima()
@@ -0,0 +1,113 @@
+import numpy as np
+from operators.Operators import Operators as Ops
+from operators.NoisyDeterministicTensor import NoisyDeterministicTensor
+
+
+#
+# This class stores the generative model of a maze, i.e. the A, B and D matrices, along with their logarithms.
+# The model is computed once per maze and is immutable, so it can be shared by all agents and episodes.
+#
+# When sparse is True, A and B are stored as NoisyDeterministicTensor, i.e. the noise floor and the deterministic
+# entries are stored separately, and all the expectations below run in O(S.A) instead of O(S^2.A).
+#
+# The arrays of the model can also be given (e.g. read-only memory-mapped arrays loaded by ModelCache), in which case
+# they are used as is instead of being compiled from the environment.
+#
+class MazeModel:
+
+    def __init__(self, env, sparse=False, arrays=None):
+        # Representation of the A and B matrices
+        self.sparse = sparse
+
+        # Arrays of the model, either compiled from the environment or loaded from disk (see ModelCache)
+        if arrays is None:
+            arrays = MazeModel.compile(env, sparse)
+
+        # Prior parameters
+        if sparse:
+            a = NoisyDeterministicTensor.from_noise(arrays["a"], env.observations(), env.noise)
+            b = NoisyDeterministicTensor.from_noise(arrays["b"], env.states(), env.noise)
+        else:
+            a = MazeModel.freeze(arrays["a"])
+            b = MazeModel.freeze(arrays["b"])
+        d = MazeModel.freeze(arrays["d"])
+        self.a = a
+        self.b = b
+        self.d = d
+
+        # Logarithms of the prior parameters
+        self.log_a = a.log() if sparse else MazeModel.freeze(arrays["log_a"])
+        self.log_b = b.log() if sparse else MazeModel.freeze(arrays["log_b"])
+        self.log_d = MazeModel.freeze(np.log(d))
+
+        # Model sizes
+        self.n_observations = a.shape[0]
+        self.n_states = a.shape[1]
+        self.n_actions = b.shape[2]
+
+        # Prevent any further modification of the model
+        self.frozen = True
+
+    @staticmethod
+    def compile(env, sparse):
+        # Compute the arrays of the model, i.e. the indices of the deterministic entries of A and B if sparse, and
+        # the dense matrices (along with their logarithms) otherwise
+        if sparse:
+            return {"a": env.states_obs, "b": env.next_states, "d": env.d()}
+        a = env.a()
+        b = env.b()
+        return {"a": a, "b": b, "d": env.d(), "log_a": np.log(a), "log_b": np.log(b)}
+
+    def __setattr__(self, name, value):
+        if getattr(self, "frozen", False):
+            raise RuntimeError("In MazeModel, the model is immutable.")
+        object.__setattr__(self, name, value)
+
+    @staticmethod
+    def freeze(x):
+        x.flags.writeable = False
+        return x
+
+    # In the functions below, the inputs can have extra leading (batch) dimensions.
+
+    def log_likelihood(self, z):
+        # Compute np.matmul(np.log(A).T, z)
+        if self.sparse:
+            return self.log_a.average(z, [0])
+        return np.matmul(z, self.log_a)
+
+    def observation_log_likelihood(self, obs):
+        # Compute np.matmul(np.log(A).T, one_hot(obs)) without any multiplication
+        if self.sparse:
+            return self.log_a.slice(obs)
+        return self.log_a[obs]
+
+    def observation_likelihood(self, obs):
+        # Compute P(obs|S), i.e. A[obs]
+        if self.sparse:
+            return self.a.slice(obs)
+        return self.a[obs]
+
+    def transition_forward(self, x):
+        # Compute P(S_tau+1|U_tau) = sum_s P(S_tau+1|S_tau = s, U_tau) x(s) for a distribution x over S_tau
+        if self.sparse:
+            return self.b.average(x, [1])
+        if x.ndim == 1:
+            return Ops.average(self.b, x, [1])
+        return np.einsum("ijk,...j->...ik", self.b, x)
+
+    def log_transition_forward(self, x):
+        # Expectation of log P(S_tau+1|S_tau, U_tau) w.r.t. a distribution x over S_tau
+        if self.sparse:
+            return self.log_b.average(x, [1])
+        if x.ndim == 1:
+            return Ops.average(self.log_b, x, [1])
+        return np.einsum("ijk,...j->...ik", self.log_b, x)
+
+    def log_transition_backward(self, x):
+        # Expectation of log P(S_tau+1|S_tau, U_tau) w.r.t. a distribution x over (S_tau+1, U_tau)
+        if self.sparse:
+            return self.log_b.average(x, [0, 2])
+        if x.ndim == 2:
+            return Ops.average(self.log_b, x, [0, 2])
+        return np.einsum("ijk,...ik->...j", self.log_b, x)
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+from environments.MazeEnv import MazeEnv
+
+
+#
+# This class stores many mazes in a single binary bundle (an uncompressed .npz file), i.e. the walls of all the mazes
+# concatenated in one array, along with the shape, initial agent position, exit position, number of states and local
+# minima of each maze, indexed by the name of the maze. The mazes are validated when the bundle is compiled, so the
+# environments can then be created from the bundle without parsing any text.
+#
+class MazeRegistry:
+
+    # Version of the bundle format
+    version = 1
+
+    # Bundles already loaded by the current process, indexed by file name (see MazeRegistry.load)
+    registries = {}
+
+    def __init__(self, bundle_file_name):
+        with np.load(bundle_file_name) as bundle:
+            if int(bundle["version"]) != MazeRegistry.version:
+                raise RuntimeError("In MazeRegistry, unsupported bundle version in " + bundle_file_name + ".")
+            self.names = bundle["names"].tolist()
+            self.shapes = bundle["shapes"]
+            self.offsets = bundle["offsets"]
+            self.walls = bundle["walls"]
+            self.agent_positions = bundle["agent_positions"]
+            self.exit_positions = bundle["exit_positions"]
+            self.n_states = bundle["n_states"]
+            self.minima_offsets = bundle["minima_offsets"]
+            self.minima = bundle["minima"]
+        self.indices = {name: i for i, name in enumerate(self.names)}
+
+    @staticmethod
+    def load(bundle_file_name):
+        # Load each bundle only once per process, and return the shared instance
+        if bundle_file_name not in MazeRegistry.registries:
+            MazeRegistry.registries[bundle_file_name] = MazeRegistry(bundle_file_name)
+        return MazeRegistry.registries[bundle_file_name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def index(self, maze):
+        # Return the index of a maze, given either its name or its index
+        if isinstance(maze, str):
+            if maze not in self.indices:
+                raise RuntimeError("In MazeRegistry, unknown maze '" + maze + "'.")
+            return self.indices[maze]
+        return int(maze)
+
+    def grid(self, maze):
+        i = self.index(maze)
+        return self.walls[self.offsets[i]:self.offsets[i + 1]].reshape(self.shapes[i])
+
+    def env(self, maze, noise=0.01):
+        i = self.index(maze)
+        return MazeEnv.from_grid(self.grid(i), self.agent_positions[i], self.exit_positions[i], noise)
+
+    def local_minima(self, maze):
+        i = self.index(maze)
+        return self.minima[self.minima_offsets[i]:self.minima_offsets[i + 1]].tolist()
+
+    @staticmethod
+    def find_mazes(sources):
+        # Return the (name, maze file name or array of characters) pairs of the sources, where each source is either
+        # a directory (i.e. all its .maze files), a .maze file, or a (name, array of characters) pair
+        mazes = []
+        for source in sources:
+            if not isinstance(source, str):
+                mazes.append(source)
+            elif os.path.isdir(source):
+                files = sorted(name for name in os.listdir(source) if name.endswith(".maze"))
+                mazes += [(os.path.splitext(name)[0], os.path.join(source, name)) for name in files]
+            else:
+                mazes.append((os.path.splitext(os.path.basename(source))[0], source))
+        return mazes
+
+    @staticmethod
+    def compile(sources, bundle_file_name):
+        # Validate the mazes of the sources, write the valid ones in the bundle, and return the list of
+        # (name, reason) pairs of the invalid mazes
+        envs = []
+        rejected = []
+        for name, maze in MazeRegistry.find_mazes(sources):
+            try:
+                if any(name == other for other, _ in envs):
+                    raise RuntimeError("Duplicated maze name '" + name + "'.")
+                envs.append((name, MazeEnv(maze) if isinstance(maze, str) else MazeEnv.from_array(maze)))
+            except (RuntimeError, OSError, UnicodeDecodeError, ValueError) as error:
+                rejected.append((name, str(error)))
+
+        # Concatenate the arrays of all the mazes
+        walls = [env.maze.astype(np.uint8).ravel() for _, env in envs]
+        minima = [np.array(env.local_minima(), dtype=np.int32).reshape(-1, 2) for _, env in envs]
+        np.savez(
+            bundle_file_name,
+            version=MazeRegistry.version,
+            names=np.array([name for name, _ in envs], dtype=str),
+            shapes=np.array([env.maze.shape for _, env in envs], dtype=np.int32).reshape(-1, 2),
+            offsets=np.cumsum([0] + [w.size for w in walls]),
+            walls=np.concatenate(walls) if len(walls) != 0 else np.zeros(0, dtype=np.uint8),
+            agent_positions=np.array([env.agent_initial_pos for _, env in envs], dtype=np.int32).reshape(-1, 2),
+            exit_positions=np.array([env.exit_pos for _, env in envs], dtype=np.int32).reshape(-1, 2),
+            n_states=np.array([env.states() for _, env in envs], dtype=np.int32),
+            minima_offsets=np.cumsum([0] + [len(m) for m in minima]),
+            minima=np.concatenate(minima) if len(minima) != 0 else np.zeros([0, 2], dtype=np.int32)
+        )
+        return rejected
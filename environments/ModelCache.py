@@ -0,0 +1,60 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from environments.MazeEnv import MazeEnv
+from environments.MazeModel import MazeModel
+
+
+#
+# This class stores the compiled arrays of the maze models on disk, indexed by a hash of the content of the maze
+# (i.e. its walls, initial agent position and exit position), the noise level and the representation of the model
+# (sparse or dense). The arrays are saved once as .npy files, and are then loaded as read-only memory-mapped arrays,
+# so that all the processes using the same model share a single physical copy instead of each compiling and
+# allocating its own.
+#
+class ModelCache:
+
+    # Version of the compiled arrays, to increment whenever MazeModel.compile changes.
+    version = 1
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    @staticmethod
+    def key(env, sparse):
+        content = hashlib.sha256()
+        content.update(env.maze.astype(np.uint8).tobytes())
+        content.update(np.array(env.maze.shape + tuple(env.agent_initial_pos) + tuple(env.exit_pos)).tobytes())
+        content.update(("|" + repr(float(env.noise)) + "|" + str(sparse) + "|" + str(ModelCache.version)).encode())
+        return content.hexdigest()
+
+    def get(self, maze_file_name, noise=0.01, sparse=True):
+        # Return the environment and the model of the maze file.
+        env = MazeEnv(maze_file_name, noise)
+        return env, self.get_model(env, sparse)
+
+    def get_model(self, env, sparse=True):
+        # Return the model of the environment, compiling and saving it if it is not cached yet.
+        path = os.path.join(self.directory, ModelCache.key(env, sparse))
+        if not os.path.isdir(path):
+            self.save(path, MazeModel.compile(env, sparse))
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r")
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return MazeModel(env, sparse, arrays)
+
+    def save(self, path, arrays):
+        # Write the arrays in a temporary directory, which is then renamed, so that other processes never see a
+        # partially written model (if another process saved the same model in the meantime, its copy is kept).
+        directory = tempfile.mkdtemp(dir=self.directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name + ".npy"), array)
+        try:
+            os.rename(directory, path)
+        except OSError:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
@@ -0,0 +1,74 @@
+import json
+import os
+from experiments.EpisodeResult import EpisodeResult
+
+
+#
+# This class stores the results of the finished episodes in an append-only file, i.e. one JSON record per line,
+# so that an interrupted run can be resumed without running these episodes again. Each record contains the outcome
+# of the episode (i.e. the index of the MazePerformanceTracker counter it increments), its final position, number of
+# steps, stop reason, number of iterations, wall time, and the final state of its random number generator.
+#
+# The records are indexed by a key identifying the experiment (see Checkpoint.key) and by the episode index, so that
+# several experiments can share the same file, only the records of the same experiment are reused, and the records
+# can be appended in the order in which the episodes finish. Because the random number generator
+# of each episode only depends on the seed and the episode index, a resumed run gives the same final statistics.
+#
+class Checkpoint:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    @staticmethod
+    def key(config, seed, stop_conditions):
+        # The parameters on which the results of the episodes depend.
+        return "|".join(str(x) for x in [
+            config.maze_file_name, config.action_perception_cycles, config.noise, config.epsilon, config.window, seed,
+            stop_conditions.exit_reached, stop_conditions.stall_steps, stop_conditions.time_budget
+        ])
+
+    def load(self, key):
+        # Return the results of the finished episodes of the experiment, indexed by episode.
+        results = {}
+        if not os.path.exists(self.file_name):
+            return results
+        complete = True
+        with open(self.file_name, "r") as file:
+            for line in file:
+                # Ignore the last record if it was only partially written.
+                complete = line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record["key"] != key:
+                    continue
+                results[record["episode"]] = EpisodeResult(
+                    record["episode"], record["agent_pos"], record["exit_pos"], record["steps"],
+                    record["stop_reason"], record["iterations"], record["time"], record["rng_state"]
+                )
+
+        # Terminate the partially written record, so that the next records start on a new line.
+        if not complete:
+            with open(self.file_name, "a") as file:
+                file.write("\n")
+        return results
+
+    def save(self, key, result, outcome):
+        # Append the record of a finished episode, and make sure it is written to disk.
+        record = {
+            "key": key,
+            "episode": int(result.episode),
+            "outcome": int(outcome),
+            "agent_pos": [int(x) for x in result.agent_pos],
+            "exit_pos": [int(x) for x in result.exit_pos],
+            "steps": int(result.steps),
+            "stop_reason": result.stop_reason,
+            "iterations": int(result.iterations),
+            "time": float(result.time),
+            "rng_state": result.rng_state
+        }
+        with open(self.file_name, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
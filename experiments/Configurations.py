@@ -6,6 +6,24 @@ from experiments.ExperimentConfig import ExperimentConfig as Config
 #
 class Configurations:
 
+    # The mazes for which a configuration exists.
+    mazes = [1, 5, 7, 8, 9, 14]
+
     @staticmethod
     def create():
-        return [Config(maze) for maze in [1, 5, 7, 8, 9, 14]]
+        return [Config(maze) for maze in Configurations.mazes]
+
+    @staticmethod
+    def grid(mazes=None, nb_episodes=None, ap_cycles=None, noises=None, epsilons=None, windows=None, registry=None):
+        # Create one configuration for each combination of parameters (None stands for the default value), where the
+        # mazes are the names of mazes in the registry if any.
+        mazes = Configurations.mazes if mazes is None else mazes
+        return [
+            Config(maze, nb_episodes=n, ap_cycles=c, noise=noise, epsilon=epsilon, window=window, registry=registry)
+            for maze in mazes
+            for n in ([100] if nb_episodes is None else nb_episodes)
+            for c in ([30] if ap_cycles is None else ap_cycles)
+            for noise in ([0.01] if noises is None else noises)
+            for epsilon in ([0.01] if epsilons is None else epsilons)
+            for window in ([None] if windows is None else windows)
+        ]
@@ -0,0 +1,19 @@
+#
+# This class stores the outcome of one episode.
+#
+class EpisodeResult:
+
+    def __init__(
+        self, episode, agent_pos, exit_pos, steps, stop_reason, iterations=0, time=0.0, rng_state=None,
+        trajectory=None, profile=None
+    ):
+        self.episode = episode
+        self.agent_pos = agent_pos
+        self.exit_pos = exit_pos
+        self.steps = steps
+        self.stop_reason = stop_reason
+        self.iterations = iterations
+        self.time = time
+        self.rng_state = rng_state
+        self.trajectory = trajectory
+        self.profile = profile
@@ -0,0 +1,261 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import copy
+import time
+import numpy as np
+from environments.MazeEnv import MazeEnv
+from environments.MazeModel import MazeModel
+from environments.ModelCache import ModelCache
+from environments.MazeRegistry import MazeRegistry
+from agents.AgentCFE import AgentCFE
+from agents.AgentBatchCFE import AgentBatchCFE
+from agents.AgentRecedingCFE import AgentRecedingCFE
+from agents.PosteriorCache import PosteriorCache
+from experiments.EpisodeResult import EpisodeResult
+from experiments.StopConditions import StopConditions
+from experiments.Checkpoint import Checkpoint
+from experiments.TrajectoryRecorder import TrajectoryRecorder
+from experiments.Profiler import Profiler
+
+
+#
+# This class runs the episodes of an experiment, either sequentially or using a pool of worker processes.
+# The random number generator of each episode is seeded from the episode index, so the results only depend
+# on the seed and not on the number of workers.
+#
+# When batched is True, all the episodes are run at once by an AgentBatchCFE, i.e. each action-perception cycle
+# is a few vectorised operations over all the episodes.
+#
+# Each episode stops early when one of the stop conditions is met (by default, when the agent reached the exit).
+#
+# If a checkpoint is given, the result of each episode is saved as soon as the episode is finished, and the episodes
+# already saved by a previous (interrupted) run of the same experiment are not run again.
+#
+# If a trajectory file is given, the trajectory of each episode is recorded (including the posterior over actions
+# if record_posterior is True), and appended to the file as soon as the episode is finished.
+#
+# If a model cache directory is given, the compiled models are saved on disk once, and then memory-mapped by all the
+# processes (see ModelCache).
+#
+# If profile is True, each result contains a Profiler measuring where the time of its episode was spent (in batched
+# mode, all the results share the profiler of the batch).
+#
+class EpisodeRunner:
+
+    # Environments and models already created by the current process, indexed by maze file name and noise.
+    mazes = {}
+
+    # Caches of converged posteriors of the current process, shared by the episodes it runs with the same agent
+    # parameters (i.e. time horizon and convergence threshold), indexed by these parameters.
+    caches = {}
+
+    def __init__(
+        self, config, n_workers=1, seed=0, verbose=False, batched=False, cache_size=0, stop_conditions=None,
+        checkpoint=None, trajectory_file=None, record_posterior=False, profile=False, model_cache=None
+    ):
+        self.config = config
+        self.n_workers = n_workers
+        self.seed = seed
+        self.verbose = verbose
+        self.batched = batched
+        self.cache_size = cache_size
+        self.stop_conditions = StopConditions() if stop_conditions is None else stop_conditions
+        self.checkpoint = checkpoint
+        self.trajectory_file = trajectory_file
+        self.record_posterior = record_posterior
+        self.profile = profile
+        self.model_cache = model_cache
+
+    def run(self, perf_tracker, steps_tracker=None):
+        # Load the episodes finished by a previous run.
+        n = self.config.n_episodes
+        key = None if self.checkpoint is None else Checkpoint.key(self.config, self.seed, self.stop_conditions)
+        results = {} if self.checkpoint is None else self.checkpoint.load(key)
+
+        # Run the remaining episodes, and save each result as soon as it is available.
+        for result in self.run_episodes([j for j in range(n) if j not in results]):
+            results[result.episode] = result
+            if result.trajectory is not None:
+                result.trajectory.flush(self.trajectory_file)
+            if self.checkpoint is not None:
+                self.checkpoint.save(key, result, perf_tracker.classify(result.agent_pos, result.exit_pos))
+
+        # Evaluate the episodes in order.
+        results = [results[j] for j in range(n)]
+        for result in results:
+            perf_tracker.track_position(result.agent_pos, result.exit_pos)
+            if steps_tracker is not None:
+                steps_tracker.track(result)
+        return results
+
+    def run_episodes(self, episodes):
+        # Run the episodes in the list, and yield their results as soon as they are available, i.e. in the order in
+        # which the episodes finish when several workers are used (each result contains the index of its episode).
+        if len(episodes) == 0:
+            return
+        if self.batched:
+            yield from self.run_batch(episodes)
+        elif self.n_workers <= 1:
+            for j in episodes:
+                yield self.run_episode(j)
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                futures = [pool.submit(self.run_episode, j) for j in episodes]
+                for future in as_completed(futures):
+                    yield future.result()
+
+    @staticmethod
+    def get_maze(config, model_cache=None):
+        # Create the environment and model only once per process (loading the model from the cache directory if any).
+        key = (config.maze_file_name, config.noise)
+        if key not in EpisodeRunner.mazes:
+            if config.registry is None:
+                env = MazeEnv(config.maze_file_name, config.noise)
+            else:
+                env = MazeRegistry.load(config.registry).env(str(config.maze_number), config.noise)
+            model = MazeModel(env, sparse=True) if model_cache is None else ModelCache(model_cache).get_model(env)
+            EpisodeRunner.mazes[key] = (env, model)
+        return EpisodeRunner.mazes[key]
+
+    @staticmethod
+    def create_rng(seed, episode):
+        return np.random.default_rng([seed, episode])
+
+    @staticmethod
+    def get_cache(cache_size, parameters=None):
+        # Create the cache of converged posteriors only once per process (None if caching is disabled).
+        if cache_size <= 0:
+            return None
+        cache = EpisodeRunner.caches.get(parameters)
+        if cache is None or cache.max_entries != cache_size:
+            cache = PosteriorCache(cache_size)
+            EpisodeRunner.caches[parameters] = cache
+        return cache
+
+    def run_episode(self, episode):
+        start = time.perf_counter()
+        config = self.config
+        env, model = EpisodeRunner.get_maze(config, self.model_cache)
+
+        # Reset the environment and create the agent
+        o0 = env.reset()
+        rng = EpisodeRunner.create_rng(self.seed, episode)
+        cache = EpisodeRunner.get_cache(self.cache_size, (config.action_perception_cycles, config.epsilon))
+        if config.window is None:
+            agent = AgentCFE(
+                env, o0, time_horizon=config.action_perception_cycles, model=model, rng=rng, cache=cache,
+                epsilon=config.epsilon, verbose=self.verbose
+            )
+        else:
+            agent = AgentRecedingCFE(
+                env, o0, window=config.window, model=model, rng=rng, epsilon=config.epsilon, verbose=self.verbose
+            )
+        recorder = self.create_recorder(episode, env.agent_state(), o0)
+        profiler = self.create_profiler(agent, env)
+
+        # Run one episode.
+        stop_conditions = copy.copy(self.stop_conditions)
+        stop_conditions.reset(env.agent_position())
+        stop_reason = StopConditions.MAX_STEPS
+        steps = 0
+        if self.verbose:
+            env.print()
+        for k in range(config.action_perception_cycles):
+            action = agent.step(env)
+            steps += 1
+            if recorder is not None:
+                recorder.record(action, env.agent_state(), env.states_obs[env.agent_state()], agent.e[k])
+            if self.verbose:
+                env.print()
+            reason = stop_conditions.check(env.agent_position(), env.exit_position())
+            if reason is not None:
+                stop_reason = reason
+                break
+        if profiler is not None:
+            profiler.detach()
+            profiler.iterations = list(agent.iterations)
+
+        return EpisodeResult(
+            episode, env.agent_position().copy(), env.exit_position().copy(), steps, stop_reason,
+            sum(agent.iterations), time.perf_counter() - start, rng.bit_generator.state, recorder, profiler
+        )
+
+    def create_recorder(self, episode, state, obs):
+        # Create the recorder of an episode's trajectory (None if trajectories are not recorded).
+        if self.trajectory_file is None:
+            return None
+        recorder = TrajectoryRecorder(self.config.action_perception_cycles, MazeEnv.actions(), self.record_posterior)
+        recorder.reset(episode, state, obs)
+        return recorder
+
+    def create_profiler(self, agent, env):
+        # Create a profiler attached to the agent and the environment (None if profiling is disabled).
+        if not self.profile:
+            return None
+        profiler = Profiler()
+        profiler.attach(agent, env)
+        return profiler
+
+    def run_batch(self, episodes=None):
+        config = self.config
+        env, model = EpisodeRunner.get_maze(config, self.model_cache)
+        episodes = list(range(config.n_episodes)) if episodes is None else episodes
+        if config.window is not None:
+            raise RuntimeError("In EpisodeRunner.run_batch, the receding-horizon agent cannot be batched.")
+        n = len(episodes)
+
+        # Reset the environments and create the agents
+        o0 = env.reset()
+        states = np.full(n, env.agent_state())
+        rngs = [EpisodeRunner.create_rng(self.seed, j) for j in episodes]
+        agent = AgentBatchCFE(
+            env, np.full(n, o0), time_horizon=config.action_perception_cycles, model=model, rngs=rngs,
+            epsilon=config.epsilon
+        )
+
+        # Create the stop conditions and statistics of each episode
+        stop_conditions = [copy.copy(self.stop_conditions) for j in range(n)]
+        for j in range(n):
+            stop_conditions[j].reset(env.agent_position())
+        stop_reasons = [StopConditions.MAX_STEPS] * n
+        recorders = [self.create_recorder(episodes[j], states[j], o0) for j in range(n)]
+        profiler = self.create_profiler(agent, env)
+        steps = np.zeros(n, dtype=int)
+        iterations = np.zeros(n, dtype=int)
+        times = np.zeros(n)
+
+        # Run all the episodes at once, where running contains the episodes that did not stop yet.
+        start = time.perf_counter()
+        obs = np.full(n, o0)
+        running = np.arange(n)
+        for k in range(config.action_perception_cycles):
+            agent.inference(running)
+            iterations[running] += agent.iterations[running]
+            actions = agent.action_selection(running)
+            states[running], obs[running] = env.step(states[running], actions)
+            agent.observe(obs)
+            if self.trajectory_file is not None:
+                for j, action in zip(running, actions):
+                    recorders[j].record(action, states[j], obs[j], agent.e[j, k])
+            steps[running] += 1
+            times[running] = time.perf_counter() - start
+
+            # Check the stop conditions of the running episodes.
+            stopped = []
+            for j in running:
+                reason = stop_conditions[j].check(env.states_pos[states[j]].tolist(), env.exit_position())
+                if reason is not None:
+                    stop_reasons[j] = reason
+                    stopped.append(j)
+            running = np.setdiff1d(running, stopped)
+            if running.size == 0:
+                break
+        if profiler is not None:
+            profiler.detach()
+
+        return [
+            EpisodeResult(
+                episodes[j], env.states_pos[states[j]].tolist(), env.exit_position().copy(), int(steps[j]),
+                stop_reasons[j], int(iterations[j]), float(times[j]), rngs[j].bit_generator.state,
+                recorders[j], profiler
+            ) for j in range(n)
+        ]
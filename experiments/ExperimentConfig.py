@@ -1,9 +1,19 @@
+from environments.MazeEnv import MazeEnv
+from environments.MazeRegistry import MazeRegistry
+
+
 #
-# This class stores the configuration of an experiment.
+# This class stores the configuration of an experiment. The maze is either one of the mazes in ./data/mazes (i.e.
+# maze_number), any maze file (e.g. a generated maze), or the maze named maze_number in a bundle compiled by
+# MazeRegistry (registry), whose local minima are then computed from the maze.
+# If window is not None, the agent plans over a sliding window of that many time steps (see AgentRecedingCFE).
 #
 class ExperimentConfig:
 
-    def __init__(self, maze_number, nb_episodes=100, ap_cycles=30):
+    def __init__(
+        self, maze_number, nb_episodes=100, ap_cycles=30, noise=0.01, epsilon=0.01, maze_file_name=None, window=None,
+        registry=None
+    ):
         local_minima = {
             1:  [[3, 4]],
             5:  [[3, 3]],
@@ -13,13 +23,31 @@ class ExperimentConfig:
             14: [[3, 4], [7, 4]]
         }
 
-        self.local_minima_pos = local_minima[maze_number]
-        self.maze_file_name = "./data/mazes/" + str(maze_number) + ".maze"
+        self.maze_number = maze_number
+        self.registry = registry
+        if registry is not None:
+            maze_file_name = registry + "#" + str(maze_number)
+        elif maze_file_name is None:
+            maze_file_name = "./data/mazes/" + str(maze_number) + ".maze"
+        self.maze_file_name = maze_file_name
+        if registry is not None:
+            self.local_minima_pos = MazeRegistry.load(registry).local_minima(str(maze_number))
+        elif maze_number in local_minima:
+            self.local_minima_pos = local_minima[maze_number]
+        else:
+            self.local_minima_pos = MazeEnv(maze_file_name).local_minima()
         self.action_perception_cycles = ap_cycles
         self.n_episodes = nb_episodes
+        self.noise = noise
+        self.epsilon = epsilon
+        self.window = window
 
     def print(self, file):
         file.write("========== EXPERIMENT CONFIGURATION ==========\n")
         file.write("Number of action-perception cycles: " + str(self.action_perception_cycles) + "\n")
         file.write("Number of simulations: " + str(self.n_episodes) + "\n")
         file.write("Maze file's name: " + self.maze_file_name + "\n")
+        file.write("Noise: " + str(self.noise) + "\n")
+        file.write("Convergence threshold: " + str(self.epsilon) + "\n")
+        if self.window is not None:
+            file.write("Planning window: " + str(self.window) + "\n")
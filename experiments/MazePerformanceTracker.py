@@ -1,3 +1,6 @@
+from environments.MazeEnv import MazeEnv
+
+
 class MazePerformanceTracker:
 
     def __init__(self, local_minima_pos, tolerance_level = 1):
@@ -11,20 +14,25 @@ class MazePerformanceTracker:
             self.perf[i] = 0
 
     def track(self, env):
-        agent_pos = env.agent_position()
-        exit_pos = env.exit_position()
+        self.track_position(env.agent_position(), env.exit_position())
+
+    def track_position(self, agent_pos, exit_pos):
+        self.perf[self.classify(agent_pos, exit_pos)] += 1
+
+    def classify(self, agent_pos, exit_pos):
+        # Return the index of the counter corresponding to the final position of the agent.
         local_min = -1
 
         for i in range(len(self.local_pos)):
-            if env.manhattan_distance(agent_pos, self.local_pos[i]) <= self.tolerance:
+            if MazeEnv.manhattan_distance(agent_pos, self.local_pos[i]) <= self.tolerance:
                 local_min = i
 
-        if env.manhattan_distance(agent_pos, exit_pos) <= self.tolerance:
-            self.perf[len(self.perf) - 1] += 1
+        if MazeEnv.manhattan_distance(agent_pos, exit_pos) <= self.tolerance:
+            return len(self.perf) - 1
         elif local_min != - 1:
-            self.perf[local_min + 1] += 1
+            return local_min + 1
         else:
-            self.perf[0] += 1
+            return 0
 
     def print(self, file):
         total = sum(self.perf)
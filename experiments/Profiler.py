@@ -0,0 +1,93 @@
+import time
+
+
+#
+# This class measures where the time of an episode is spent. When attached to an agent, its solver and its
+# environment, the methods of each phase are replaced (on these instances only) by wrappers accumulating the number
+# of calls and the time spent in each phase, and the original methods are restored when the profiler is detached.
+# So, an agent without profiler runs exactly the same code as before. The times are inclusive, e.g. the time of
+# "actions" includes the time of "solver", and only the outermost call is counted when methods of the same phase
+# call each other.
+#
+class Profiler:
+
+    # The phases of an episode, and the methods in which they are performed, i.e. (phase, owner, method name).
+    # The owner is either the agent, its linear programming solver, or the environment.
+    phases = [
+        ("inference", "agent", "inference"),
+        ("hidden_states", "agent", "update_posterior_over_hidden_states"),
+        ("hidden_states", "agent", "update_posterior_over_hidden_state"),
+        ("actions", "agent", "update_posterior_over_actions"),
+        ("actions", "agent", "update_posterior_over_actions_using_lp"),
+        ("actions", "agent", "update_posterior_over_action_using_lp"),
+        ("solver", "solver", "solve"),
+        ("cfe", "agent", "cfe"),
+        ("action_selection", "agent", "action_selection"),
+        ("environment", "env", "execute"),
+        ("environment", "env", "step")
+    ]
+
+    def __init__(self):
+        # Cumulative time and number of calls of each phase, and number of iterations of each call to inference
+        self.times = {}
+        self.calls = {}
+        self.depth = {}
+        self.iterations = []
+
+        # The instances whose methods are currently wrapped
+        self.wrapped = []
+
+    def attach(self, agent, env):
+        owners = {"agent": agent, "solver": agent.lp_solver, "env": env}
+        for phase, owner, name in Profiler.phases:
+            owner = owners[owner]
+            if hasattr(owner, name) and (owner, name) not in self.wrapped:
+                setattr(owner, name, self.wrap(phase, getattr(owner, name)))
+                self.wrapped.append((owner, name))
+
+    def detach(self):
+        # Remove the wrappers, so that the methods of the classes are used again.
+        for owner, name in self.wrapped:
+            delattr(owner, name)
+        self.wrapped = []
+
+    def wrap(self, phase, method):
+        self.times.setdefault(phase, 0.0)
+        self.calls.setdefault(phase, 0)
+        self.depth.setdefault(phase, 0)
+
+        def timed_method(*args, **kwargs):
+            if self.depth[phase] != 0:
+                return method(*args, **kwargs)
+            self.depth[phase] += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.times[phase] += time.perf_counter() - start
+                self.calls[phase] += 1
+                self.depth[phase] -= 1
+        return timed_method
+
+    def print(self, file):
+        file.write("Phase: calls, total time (s), time per call (s)\n")
+        for phase in sorted(self.times.keys(), key=lambda p: -self.times[p]):
+            calls = self.calls[phase]
+            per_call = self.times[phase] / calls if calls != 0 else 0
+            file.write(phase + ": " + str(calls) + ", " + str(self.times[phase]) + ", " + str(per_call) + "\n")
+        if len(self.iterations) != 0:
+            file.write("Iterations per inference: " + str(self.iterations) + "\n")
+
+    @staticmethod
+    def print_results(file, results):
+        # Write the profile of each episode (or of each batch of episodes sharing a profile).
+        file.write("========== PROFILER ==========\n")
+        profiles = {}
+        for result in results:
+            if result.profile is not None:
+                profiles.setdefault(id(result.profile), (result.profile, []))[1].append(result.episode)
+        for profile, episodes in profiles.values():
+            label = "Episodes " + str(episodes) if len(episodes) > 1 else "Episode " + str(episodes[0])
+            file.write(label + ":\n")
+            profile.print(file)
+        file.write("\n")
@@ -0,0 +1,84 @@
+import json
+import os
+import numpy as np
+from experiments.StopConditions import StopConditions
+
+
+#
+# This class stores the results of many runs in a directory, as append-only binary records with one row per episode.
+# The rows of all runs are stored in a single file of fixed-size records (see ResultsStore.dtype), so that loading
+# them is a single memory-mapping, and the description of each run (configuration and seed) is stored as one JSON
+# record per line in a second file. The outcome of an episode is the index of the MazePerformanceTracker counter it
+# increments, i.e. 0 for other positions, i for the i-th local minimum, and the number of local minima plus one for
+# the exit, and the stop reason is its index in StopConditions.REASONS.
+#
+class ResultsStore:
+
+    # The format of the records, i.e. one row per episode.
+    dtype = np.dtype([
+        ("run", "<i4"),
+        ("episode", "<i4"),
+        ("agent_pos", "<i4", (2,)),
+        ("outcome", "<i4"),
+        ("stop_reason", "<i4"),
+        ("steps", "<i4"),
+        ("iterations", "<i4"),
+        ("time", "<f8")
+    ])
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.episodes_file_name = os.path.join(directory, "episodes.bin")
+        self.runs_file_name = os.path.join(directory, "runs.jsonl")
+
+    def add_run(self, config, seed):
+        # Add the description of a new run, and return its index.
+        run = len(self.runs())
+        record = {
+            "run": run,
+            "maze_file_name": config.maze_file_name,
+            "n_episodes": config.n_episodes,
+            "action_perception_cycles": config.action_perception_cycles,
+            "noise": config.noise,
+            "epsilon": config.epsilon,
+            "window": config.window,
+            "n_local_minima": len(config.local_minima_pos),
+            "seed": seed
+        }
+        with open(self.runs_file_name, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        return run
+
+    def write(self, run, results, perf_tracker):
+        # Append the rows of the episodes of a run.
+        rows = np.zeros(len(results), dtype=ResultsStore.dtype)
+        for i, result in enumerate(results):
+            rows[i] = (
+                run, result.episode, result.agent_pos, perf_tracker.classify(result.agent_pos, result.exit_pos),
+                StopConditions.REASONS.index(result.stop_reason), result.steps, result.iterations, result.time
+            )
+        with open(self.episodes_file_name, "ab") as file:
+            file.write(rows.tobytes())
+
+    def runs(self):
+        # Return the descriptions of all runs.
+        if not os.path.exists(self.runs_file_name):
+            return []
+        with open(self.runs_file_name, "r") as file:
+            return [json.loads(line) for line in file]
+
+    def load(self, runs=None):
+        # Return the rows of the runs in the list (all runs if None), where the file is memory-mapped.
+        if not os.path.exists(self.episodes_file_name) or os.path.getsize(self.episodes_file_name) == 0:
+            return np.zeros(0, dtype=ResultsStore.dtype)
+        rows = np.memmap(self.episodes_file_name, dtype=ResultsStore.dtype, mode="r")
+        return rows if runs is None else rows[np.isin(rows["run"], runs)]
+
+    def success_rates(self, runs=None):
+        # Return the run indices and the fraction of episodes of each run that reached the exit.
+        descriptions = self.runs()
+        rows = self.load(runs)
+        exits = np.array([run["n_local_minima"] + 1 for run in descriptions])
+        indices, inverse = np.unique(rows["run"], return_inverse=True)
+        solved = rows["outcome"] == exits[rows["run"]]
+        return indices, np.bincount(inverse, weights=solved) / np.bincount(inverse)
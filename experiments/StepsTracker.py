@@ -0,0 +1,27 @@
+#
+# This class tracks the number of action-perception cycles used by each episode, and why the episodes stopped.
+#
+class StepsTracker:
+
+    def __init__(self, max_steps):
+        self.max_steps = max_steps
+        self.steps = []
+        self.reasons = {}
+
+    def reset(self):
+        self.steps = []
+        self.reasons = {}
+
+    def track(self, result):
+        self.steps.append(result.steps)
+        self.reasons[result.stop_reason] = self.reasons.get(result.stop_reason, 0) + 1
+
+    def print(self, file):
+        total = len(self.steps)
+        max_steps = self.max_steps * total
+        file.write("========== STEPS TRACKER ==========\n")
+        file.write("Average number of steps: " + str(sum(self.steps) / total) + "\n")
+        file.write("Steps saved: " + str(max_steps - sum(self.steps)) + "/" + str(max_steps) + "\n")
+        for reason in sorted(self.reasons.keys()):
+            file.write("P(" + reason + "): " + str(self.reasons[reason] / total) + "\n")
+        file.write("\n")
@@ -0,0 +1,50 @@
+import time
+
+
+#
+# This class decides when an episode should stop before the end of its action-perception cycles, i.e. when the
+# agent reached the exit, when the agent's position did not change for stall_steps steps, or when the episode
+# ran for more than time_budget seconds. Each condition can be disabled, i.e. exit_reached=False or None.
+#
+class StopConditions:
+
+    # Reasons for which an episode can stop.
+    EXIT_REACHED = "exit_reached"
+    STALLED = "stalled"
+    TIME_BUDGET = "time_budget"
+    MAX_STEPS = "max_steps"
+    REASONS = [EXIT_REACHED, STALLED, TIME_BUDGET, MAX_STEPS]
+
+    def __init__(self, exit_reached=True, stall_steps=None, time_budget=None):
+        # Stop conditions
+        self.exit_reached = exit_reached
+        self.stall_steps = stall_steps
+        self.time_budget = time_budget
+
+        # State of the current episode
+        self.start = time.perf_counter()
+        self.last_pos = None
+        self.stalled_steps = 0
+
+    def reset(self, agent_pos):
+        self.start = time.perf_counter()
+        self.last_pos = list(agent_pos)
+        self.stalled_steps = 0
+
+    def check(self, agent_pos, exit_pos):
+        # Return the reason for which the episode must stop, or None if the episode must continue.
+        if self.exit_reached and StopConditions.solved(agent_pos, exit_pos):
+            return StopConditions.EXIT_REACHED
+
+        self.stalled_steps = self.stalled_steps + 1 if list(agent_pos) == self.last_pos else 0
+        self.last_pos = list(agent_pos)
+        if self.stall_steps is not None and self.stalled_steps >= self.stall_steps:
+            return StopConditions.STALLED
+
+        if self.time_budget is not None and time.perf_counter() - self.start >= self.time_budget:
+            return StopConditions.TIME_BUDGET
+        return None
+
+    @staticmethod
+    def solved(agent_pos, exit_pos):
+        return agent_pos[0] == exit_pos[0] and agent_pos[1] == exit_pos[1]
@@ -0,0 +1,103 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from experiments.EpisodeRunner import EpisodeRunner
+from experiments.MazePerformanceTracker import MazePerformanceTracker
+from experiments.StepsTracker import StepsTracker
+from experiments.Checkpoint import Checkpoint
+
+
+#
+# This class runs the episodes of several experiments, i.e. a list of configurations, in a single pool of worker
+# processes. Each (configuration, episode) pair is a task, and the tasks of the largest mazes are scheduled first,
+# so that the longest tasks do not end up running alone at the end of the sweep. The environments and models are
+# created by EpisodeRunner.get_maze, i.e. once per process, and shared by all the tasks using the same maze.
+#
+# Each episode uses the same random number generator as when its configuration is run by an EpisodeRunner,
+# so the results do not depend on the number of workers or on the other configurations of the sweep.
+#
+# If a checkpoint is given, the result of each task is saved as soon as it is available, and the tasks already
+# saved by a previous (interrupted) sweep are not run again.
+#
+class SweepRunner:
+
+    def __init__(
+        self, configs, n_workers=1, seed=0, cache_size=0, stop_conditions=None, checkpoint=None, model_cache=None
+    ):
+        self.configs = configs
+        self.n_workers = n_workers
+        self.checkpoint = checkpoint
+        self.model_cache = model_cache
+        self.runners = [
+            EpisodeRunner(
+                config, seed=seed, cache_size=cache_size, stop_conditions=stop_conditions, model_cache=model_cache
+            )
+            for config in configs
+        ]
+
+    def run(self):
+        # Load the tasks finished by a previous sweep.
+        keys = [self.key(runner) for runner in self.runners]
+        sweep_results = [
+            {} if self.checkpoint is None else self.checkpoint.load(key) for key in keys
+        ]
+
+        # Run the remaining tasks, and save each result as soon as it is available.
+        for (i, j), result in self.run_tasks(self.schedule(sweep_results)):
+            sweep_results[i][j] = result
+            if self.checkpoint is not None:
+                outcome = MazePerformanceTracker(self.configs[i].local_minima_pos).classify(
+                    result.agent_pos, result.exit_pos
+                )
+                self.checkpoint.save(keys[i], result, outcome)
+
+        # Gather the results of each configuration in order.
+        return [[results[j] for j in range(config.n_episodes)] for config, results in zip(self.configs, sweep_results)]
+
+    def run_tasks(self, tasks):
+        # Run the tasks in the list, and yield the tasks and their results as soon as they are available, i.e. in the
+        # order in which the tasks finish when several workers are used.
+        if self.n_workers <= 1:
+            for i, j in tasks:
+                yield (i, j), self.runners[i].run_episode(j)
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                futures = {pool.submit(self.runners[i].run_episode, j): (i, j) for i, j in tasks}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+
+    def key(self, runner):
+        return Checkpoint.key(runner.config, runner.seed, runner.stop_conditions)
+
+    def schedule(self, sweep_results):
+        # Sort the remaining tasks by decreasing number of states of their maze, then by configuration and episode.
+        sizes = [self.maze_size(config) for config in self.configs]
+        tasks = [
+            (i, j) for i, config in enumerate(self.configs) for j in range(config.n_episodes)
+            if j not in sweep_results[i]
+        ]
+        return sorted(tasks, key=lambda task: -sizes[task[0]])
+
+    def maze_size(self, config):
+        env, _ = EpisodeRunner.get_maze(config, self.model_cache)
+        return env.states()
+
+    def store(self, store, sweep_results):
+        # Store the results of each experiment as a separate run.
+        for config, runner, results in zip(self.configs, self.runners, sweep_results):
+            perf_tracker = MazePerformanceTracker(config.local_minima_pos)
+            store.write(store.add_run(config, runner.seed), results, perf_tracker)
+
+    def print(self, file, sweep_results):
+        # Write the configuration and the performance of each experiment.
+        for i, (config, results) in enumerate(zip(self.configs, sweep_results)):
+            file.write("========== EXPERIMENT " + str(i + 1) + "/" + str(len(self.configs)) + " ==========\n\n")
+            config.print(file)
+            perf_tracker = MazePerformanceTracker(config.local_minima_pos)
+            steps_tracker = StepsTracker(config.action_perception_cycles)
+            perf_tracker.reset()
+            steps_tracker.reset()
+            for result in results:
+                perf_tracker.track_position(result.agent_pos, result.exit_pos)
+                steps_tracker.track(result)
+            perf_tracker.print(file)
+            steps_tracker.print(file)
+            file.write("\n")
@@ -0,0 +1,78 @@
+import os
+import sys
+import numpy as np
+
+
+#
+# This class records the trajectory of an episode in preallocated arrays, i.e. the state id and observation at each
+# time step, the action performed at each step, and optionally the posterior over actions R(U_t) used to select it.
+# The trajectories are appended in bulk to a binary file (one header and one array per field, in NumPy's .npy
+# format), and can be loaded back to be replayed or rendered offline.
+#
+class TrajectoryRecorder:
+
+    def __init__(self, max_steps, n_actions, record_posterior=False):
+        # Preallocated arrays of the trajectory, where states[0] and observations[0] correspond to the initial state
+        self.states = np.zeros(max_steps + 1, dtype=np.int32)
+        self.observations = np.zeros(max_steps + 1, dtype=np.int32)
+        self.actions = np.zeros(max_steps, dtype=np.int8)
+        self.e = np.zeros([max_steps, n_actions]) if record_posterior else None
+
+        # Index of the episode and number of steps recorded so far
+        self.episode = 0
+        self.n_steps = 0
+
+    def reset(self, episode, state, obs):
+        self.episode = episode
+        self.n_steps = 0
+        self.states[0] = state
+        self.observations[0] = obs
+
+    def record(self, action, state, obs, e=None):
+        # Sanity check
+        if self.n_steps == self.actions.size:
+            raise RuntimeError("In TrajectoryRecorder.record, the maximum number of steps was exceeded.")
+
+        self.actions[self.n_steps] = action
+        if self.e is not None:
+            self.e[self.n_steps] = e
+        self.n_steps += 1
+        self.states[self.n_steps] = state
+        self.observations[self.n_steps] = obs
+
+    def flush(self, file_name):
+        # Append the trajectory recorded so far to the file.
+        n = self.n_steps
+        header = np.array([self.episode, n, self.e is not None], dtype=np.int64)
+        with open(file_name, "ab") as file:
+            np.save(file, header)
+            np.save(file, self.states[:n + 1])
+            np.save(file, self.observations[:n + 1])
+            np.save(file, self.actions[:n])
+            if self.e is not None:
+                np.save(file, self.e[:n])
+
+    @staticmethod
+    def load(file_name):
+        # Return the trajectories stored in the file, in the order in which the episodes finished (see episode).
+        trajectories = []
+        size = os.path.getsize(file_name)
+        with open(file_name, "rb") as file:
+            while file.tell() < size:
+                episode, n, record_posterior = np.load(file)
+                trajectory = TrajectoryRecorder(0, 0)
+                trajectory.episode = int(episode)
+                trajectory.n_steps = int(n)
+                trajectory.states = np.load(file)
+                trajectory.observations = np.load(file)
+                trajectory.actions = np.load(file)
+                trajectory.e = np.load(file) if record_posterior else None
+                trajectories.append(trajectory)
+        return trajectories
+
+    def replay(self, env, file=sys.stdout):
+        # Render the maze at each time step of the trajectory.
+        for t in range(self.n_steps + 1):
+            if t != 0:
+                file.write("Action: " + str(int(self.actions[t - 1])) + "\n")
+            file.write(env.render(env.states_pos[self.states[t]].tolist()))
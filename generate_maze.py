@@ -0,0 +1,23 @@
+#
+# This script generates a random maze, writes it in the format of the maze files, and prints its local minima, e.g.
+#   python generate_maze.py 31 41 --density 0.1 --dead-ends 5 --seed 3 --output ./data/mazes/generated.maze
+#
+
+import argparse
+from environments.MazeGenerator import MazeGenerator
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Generate a random maze.")
+    parser.add_argument("height", type=int, help="the height of the maze (odd number)")
+    parser.add_argument("width", type=int, help="the width of the maze (odd number)")
+    parser.add_argument("--density", type=float, default=0.0, help="the fraction of inner walls removed")
+    parser.add_argument("--dead-ends", type=int, default=None, help="the maximum number of dead ends")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the random number generator")
+    parser.add_argument("--output", required=True, help="the file in which the maze is written")
+    args = parser.parse_args()
+
+    generator = MazeGenerator(args.height, args.width, args.density, args.dead_ends, args.seed)
+    generator.write(args.output)
+    print("Local minima: " + str(generator.local_minima()))
@@ -3,25 +3,55 @@
 #
 
 from experiments.Configurations import Configurations as Configs
-from environments.MazeEnv import MazeEnv
 from experiments.TimeTracker import TimeTracker
 from experiments.MazePerformanceTracker import MazePerformanceTracker
-from agents.AgentCFE import AgentCFE
+from experiments.StepsTracker import StepsTracker
+from experiments.StopConditions import StopConditions
+from experiments.EpisodeRunner import EpisodeRunner
+from experiments.Checkpoint import Checkpoint
+from experiments.ResultsStore import ResultsStore
+from experiments.Profiler import Profiler
 
 
 def print_progression(f, i, n):
     f.write("========== EXPERIMENT " + str(i + 1) + "/" + str(n) + " ==========\n\n")
 
 
-def solved(agent_pos, exit_pos):
-    return agent_pos[0] == exit_pos[0] and agent_pos[1] == exit_pos[1]
-
-
 if __name__ == '__main__':
 
     # The index of the experiment to run.
     MAZE_ID = 1  # 0 -> 1.maze, 1 -> 5.maze, 2 -> 7.maze, 3 -> 8.maze, 4 -> 9.maze, 5 -> 14.maze
 
+    # The number of worker processes running the episodes, and the seed of the episodes' random number generators.
+    N_WORKERS = 1
+    SEED = 0
+
+    # Whether to run all the episodes at once as a batch of agents.
+    BATCHED = False
+
+    # The maximum number of converged posteriors cached by each process (0 to disable caching).
+    CACHE_SIZE = 0
+
+    # The conditions under which an episode stops before the end of its action-perception cycles.
+    STOP_CONDITIONS = StopConditions(exit_reached=True, stall_steps=None, time_budget=None)
+
+    # The file in which the finished episodes are saved, so that an interrupted run can be resumed (None to disable).
+    CHECKPOINT_FILE = None
+
+    # The directory in which the results of each episode are stored as binary records (None to disable).
+    STORE_DIRECTORY = "results"
+
+    # Whether to print the maze and the CFE at each step, and the file in which the trajectories of the episodes are
+    # recorded (None to disable).
+    VERBOSE = False
+    TRAJECTORY_FILE = None
+
+    # Whether to measure where the time of each episode is spent.
+    PROFILE = False
+
+    # The directory in which the compiled models are cached and memory-mapped by all the workers (None to disable).
+    MODEL_CACHE_DIRECTORY = None
+
     # Create all experiments configurations.
     configs = Configs.create()
     config = configs[MAZE_ID]
@@ -33,36 +63,33 @@ if __name__ == '__main__':
     print_progression(file, MAZE_ID, len(configs))
     config.print(file)
 
-    # Create environment.
-    env = MazeEnv(config.maze_file_name)
-
     # Create time and performance trackers.
     perf_tracker = MazePerformanceTracker(config.local_minima_pos)
+    steps_tracker = StepsTracker(config.action_perception_cycles)
     time_tracker = TimeTracker()
 
     # Initialise trackers.
     perf_tracker.reset()
+    steps_tracker.reset()
     time_tracker.tic()
 
     # Run the episodes.
-    for j in range(config.n_episodes):
-
-        # Reset the environment and create the agent
-        o0 = env.reset()
-        agent = AgentCFE(env, o0, time_horizon=config.action_perception_cycles)
-
-        # Run one episode.
-        env.print()
-        for k in range(config.action_perception_cycles):
-            agent.step(env)
-            env.print()
-            # TODO if solved(env.agent_position(), env.exit_position()):
-            # TODO     break
-
-        # Evaluate episode.
-        perf_tracker.track(env)
+    runner = EpisodeRunner(
+        config, n_workers=N_WORKERS, seed=SEED, verbose=VERBOSE, batched=BATCHED, cache_size=CACHE_SIZE,
+        stop_conditions=STOP_CONDITIONS, checkpoint=None if CHECKPOINT_FILE is None else Checkpoint(CHECKPOINT_FILE),
+        trajectory_file=TRAJECTORY_FILE, profile=PROFILE, model_cache=MODEL_CACHE_DIRECTORY
+    )
+    results = runner.run(perf_tracker, steps_tracker)
+
+    # Store the results of each episode.
+    if STORE_DIRECTORY is not None:
+        store = ResultsStore(STORE_DIRECTORY)
+        store.write(store.add_run(config, SEED), results, perf_tracker)
 
     # Print trackers results
     time_tracker.toc()
     time_tracker.print(file)
     perf_tracker.print(file)
+    steps_tracker.print(file)
+    if PROFILE:
+        Profiler.print_results(file, results)
@@ -0,0 +1,86 @@
+#
+# This class stores a tensor that is equal to a constant value everywhere, except for one entry along its first
+# dimension for each position in the remaining dimensions. For example, the likelihood matrix A of the maze is
+# equal to noise / (n - 1) everywhere except for one entry per column (i.e. state) that is equal to 1 - noise.
+#
+# Only the indices of the deterministic entries are stored, i.e. the memory is O(S.A) instead of O(S^2.A) for B,
+# and the operators below run in O(S.A) without ever building the dense tensor.
+#
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class NoisyDeterministicTensor:
+
+    def __init__(self, idx, n, low, high):
+        # Indices of the deterministic entries along the first dimension
+        self.idx = np.asarray(idx)
+        self.idx.flags.writeable = False
+
+        # Size of the first dimension, and values of the noisy and deterministic entries
+        self.n = n
+        self.low = low
+        self.high = high
+
+        # Shape of the (dense) tensor
+        self.shape = (n,) + self.idx.shape
+        self.ndim = len(self.shape)
+
+        # Sparse matrix mapping the remaining dimensions onto the deterministic entries, created on demand
+        self.scatter_matrix = None
+
+    @staticmethod
+    def from_noise(idx, n, noise):
+        return NoisyDeterministicTensor(idx, n, noise / (n - 1), 1 - noise)
+
+    def log(self):
+        return NoisyDeterministicTensor(self.idx, self.n, np.log(self.low), np.log(self.high))
+
+    def dense(self):
+        result = np.full(self.shape, self.low)
+        np.put_along_axis(result, self.idx[np.newaxis], self.high, axis=0)
+        return result
+
+    def slice(self, i):
+        # Compute tensor[i] in O(size of the remaining dimensions), where i can be an array of indices
+        i = np.asarray(i)
+        return np.where(self.idx == i.reshape(i.shape + (1,) * self.idx.ndim), self.high, self.low)
+
+    def average(self, x, ml):
+        # Same semantic as Operators.average(self.dense(), x, ml), where x can have extra leading (batch) dimensions
+        if ml == [0]:
+            return self.average_over_first_dimension(x)
+        if ml == [1] and self.ndim <= 3:
+            return self.average_over_second_dimension(x)
+        if ml == [0, 2] and self.ndim == 3:
+            return self.average_over_first_and_last_dimensions(x)
+        raise RuntimeError("In NoisyDeterministicTensor.average, unsupported list of dimensions: " + str(ml) + ".")
+
+    def average_over_first_dimension(self, x):
+        # x has shape [..., n] and the result has shape [...] + self.idx.shape
+        total = x.sum(axis=-1).reshape(x.shape[:-1] + (1,) * self.idx.ndim)
+        return self.low * total + (self.high - self.low) * x[..., self.idx]
+
+    def average_over_second_dimension(self, x):
+        # x has shape [..., s] and the result has shape [..., n] + self.idx.shape[1:]
+        batch = x.shape[:-1]
+        x_2d = x.reshape(-1, x.shape[-1])
+        scattered = (self.get_scatter_matrix() @ x_2d.T).T
+        result = self.low * x_2d.sum(axis=-1, keepdims=True) + (self.high - self.low) * scattered
+        return result.reshape(batch + (self.n,) + self.idx.shape[1:])
+
+    def average_over_first_and_last_dimensions(self, x):
+        # x has shape [..., n, a] and the result has shape [..., s]
+        total = x.sum(axis=(-2, -1))[..., np.newaxis]
+        gathered = x[..., self.idx, np.arange(self.idx.shape[1])]
+        return self.low * total + (self.high - self.low) * gathered.sum(axis=-1)
+
+    def get_scatter_matrix(self):
+        # Matrix of shape [n * prod(idx.shape[1:]), s] such that entry (idx[s, k] * K + k, s) is one
+        if self.scatter_matrix is None:
+            s = self.idx.shape[0]
+            k = int(np.prod(self.idx.shape[1:], dtype=int))
+            rows = (self.idx.reshape(s, k) * k + np.arange(k)).ravel()
+            cols = np.repeat(np.arange(s), k)
+            self.scatter_matrix = csr_matrix((np.ones(rows.size), (rows, cols)), shape=(self.n * k, s))
+        return self.scatter_matrix
@@ -1,7 +1,10 @@
 #
 # This class provides using mathematical operators.
 #
+import string
+from functools import lru_cache
 import numpy as np
+from scipy.special import logsumexp
 
 
 class Operators:
@@ -24,6 +27,11 @@ class Operators:
         vec[obs] = 1
         return vec
 
+    @staticmethod
+    def log_normalise(x, axis):
+        # Compute log(softmax(x, axis)) without leaving the log space, i.e. the result is finite wherever x is finite
+        return x - logsumexp(x, axis=axis, keepdims=True)
+
     @staticmethod
     def expansion(x1, n, dim):
         result = np.expand_dims(x1, dim)
@@ -31,46 +39,35 @@ class Operators:
 
     @staticmethod
     def multiplication(x1, x2, ml):
-        # Create the list on non-matching dimensions
-        not_ml = []
-        for i in range(x1.ndim):
-            if ml.count(i) == 0:
-                not_ml.append(i)
-
-        # Sequence of expansions
-        x2_tmp = x2
-        for i in not_ml:
-            x2_tmp = Operators.expansion(x2_tmp, x1.shape[i], x2_tmp.ndim)
+        # Element-wise multiplication, where x2 is broadcast (without any copy) along the dimensions of x1
+        return x1 * Operators.broadcast_view(x2, x1.ndim, ml)
 
-        # Permutation
-        pl = [0] * x1.ndim
-        for i in range(x1.ndim):
-            try:
-                pl[i] = ml.index(i)
-            except ValueError:
-                pl[i] = len(ml) + not_ml.index(i)
-        x2_tmp = x2_tmp.transpose(pl)
+    @staticmethod
+    def broadcast_view(x2, ndim, ml):
+        # Reorder the dimensions of x2 to match the order of x1, and add singleton dimensions for the others
+        order, shape = Operators.broadcast_pattern(x2.shape, ndim, tuple(ml))
+        return x2.transpose(order).reshape(shape)
 
-        # Element-wise multiplication
-        return x2_tmp * x1
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def broadcast_pattern(x2_shape, ndim, ml):
+        order = sorted(range(len(ml)), key=lambda i: ml[i])
+        shape = [1] * ndim
+        for i in range(len(ml)):
+            shape[ml[i]] = x2_shape[i]
+        return order, shape
 
     @staticmethod
     def average(x1, x2, ml, el=None):
-        if el is None:
-            el = []
+        # Multiply x1 and x2, and sum over the dimensions in ml that are not in el, i.e. over ml \ el
+        subscripts = Operators.average_subscripts(x1.ndim, tuple(ml), tuple([] if el is None else el))
+        return np.einsum(subscripts, x1, x2)
 
-        # Perform the element-wise multiplication
-        result = Operators.multiplication(x1, x2, ml)
-
-        # Create the reduction list, i.e. rl = ml \ el where "\" = set minus
-        rl = ml
-        for elem in el:
-            rl.remove(elem)
-
-        # Sort the reduction list in decreasing order
-        rl.sort(reverse=True)
-
-        # Reduction of the tensor (using a summation) along the dimension of the reduction list
-        for i in rl:
-            result = result.sum(i)
-        return result
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def average_subscripts(ndim, ml, el):
+        # Dimension i of x1 is labelled with the i-th letter, and dimension i of x2 with the same letter as ml[i]
+        x1_labels = string.ascii_letters[:ndim]
+        x2_labels = "".join(x1_labels[i] for i in ml)
+        result_labels = "".join(x1_labels[i] for i in range(ndim) if i not in ml or i in el)
+        return x1_labels + "," + x2_labels + "->" + result_labels
@@ -0,0 +1,97 @@
+#
+# This class minimises linear objectives over the probability simplex.
+#
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.special import softmax
+
+
+class SimplexSolver:
+
+    def __init__(self, backend="closed_form", tie_breaking="uniform", tie_tolerance=0.0, temperature=0.0, n_workers=1):
+        # Sanity check
+        if backend not in ["closed_form", "gekko"]:
+            raise RuntimeError("In SimplexSolver, unknown backend '" + str(backend) + "'.")
+        if tie_breaking not in ["uniform", "first"]:
+            raise RuntimeError("In SimplexSolver, unknown tie breaking rule '" + str(tie_breaking) + "'.")
+        if temperature < 0:
+            raise RuntimeError("In SimplexSolver, the temperature must be non-negative.")
+
+        # Solver parameters
+        self.backend = backend
+        self.tie_breaking = tie_breaking
+        self.tie_tolerance = tie_tolerance
+        self.temperature = temperature
+
+        # Number of GEKKO problems solved concurrently (each one runs in its own external process)
+        self.n_workers = n_workers
+
+    def solve(self, w):
+        # Each row of w is an independent problem: min_x <w, x> s.t. x >= 0 and sum(x) = 1.
+        w = np.asarray(w, dtype=np.float64)
+        if self.backend == "gekko":
+            return SimplexSolver.solve_with_gekko(w, self.n_workers)
+        if self.temperature > 0:
+            return SimplexSolver.solve_soft(w, self.temperature)
+        return SimplexSolver.solve_closed_form(w, self.tie_breaking, self.tie_tolerance)
+
+    @staticmethod
+    def solve_closed_form(w, tie_breaking="uniform", tie_tolerance=0.0):
+        # A linear objective reaches its minimum over the simplex at the vertices of the minimal weights.
+        if tie_breaking == "first":
+            return np.eye(w.shape[-1])[w.argmin(axis=-1)]
+
+        # Spread the mass uniformly over all the (near) minimal weights.
+        ties = w <= w.min(axis=-1, keepdims=True) + tie_tolerance
+        return ties / ties.sum(axis=-1, keepdims=True)
+
+    @staticmethod
+    def solve_soft(w, temperature):
+        # Entropy regularised solution, i.e. min_x <w, x> - temperature * H[x].
+        return softmax(-w / temperature, axis=-1)
+
+    @staticmethod
+    def solve_with_gekko(w, n_workers=1):
+        rows = w.reshape(-1, w.shape[-1])
+
+        # Solve all the problems, possibly submitting them all at once to a pool of threads
+        if n_workers <= 1:
+            results = [SimplexSolver.solve_row_with_gekko_in_directory(row) for row in rows]
+        else:
+            with ThreadPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(SimplexSolver.solve_row_with_gekko_in_directory, rows))
+        return np.array(results).reshape(w.shape)
+
+    @staticmethod
+    def solve_row_with_gekko_in_directory(w):
+        # GEKKO is only required by this backend.
+        from gekko import GEKKO
+
+        # Each GEKKO instance creates its own working directory, so concurrent solves cannot collide, and the
+        # directory is always removed.
+        solver = GEKKO(remote=False)
+        try:
+            return SimplexSolver.solve_row_with_gekko(solver, w)
+        finally:
+            solver.cleanup()
+
+    @staticmethod
+    def solve_row_with_gekko(solver, w):
+        # Create one variables for each parameter of R(U_tau)
+        actions = w.size
+        variables = solver.Array(solver.Var, [actions])
+        for i in range(actions):
+            variables[i].lower = 0
+            variables[i].upper = 1
+
+        # Constrain the parameters of R(U_tau) to remain on the simplex
+        solver.Equation(solver.sum(variables) == 1)
+
+        # Create the objective function
+        solver.qobj(w, x=list(variables), otype="min")
+
+        # Compute the optimal parameter of R(U_tau)
+        solver.solve(disp=False)
+
+        # Retrieve the results
+        return np.array([variables[i].value[0] for i in range(actions)])
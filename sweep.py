@@ -0,0 +1,80 @@
+#
+# This script runs a sweep of experiments, i.e. the CFE agent is evaluated on several mazes for all the combinations
+# of the parameters given on the command line, e.g.
+#   python sweep.py --mazes 1 5 7 --noise 0.01 0.05 --epsilon 0.01 0.001 --workers 4
+# or, for mazes compiled in a bundle by compile_mazes.py,
+#   python sweep.py --registry ./data/mazes.npz --mazes 1 2 generated --workers 4
+#
+
+import argparse
+from experiments.Configurations import Configurations as Configs
+from experiments.TimeTracker import TimeTracker
+from experiments.StopConditions import StopConditions
+from experiments.SweepRunner import SweepRunner
+from experiments.Checkpoint import Checkpoint
+from experiments.ResultsStore import ResultsStore
+from environments.MazeRegistry import MazeRegistry
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run a sweep of maze solving experiments.")
+    parser.add_argument("--mazes", nargs="+", default=None, help="the mazes to solve (names if --registry is used)")
+    parser.add_argument("--registry", default=None, help="the bundle of mazes compiled by compile_mazes.py")
+    parser.add_argument("--episodes", type=int, nargs="+", default=[100], help="the numbers of episodes")
+    parser.add_argument("--cycles", type=int, nargs="+", default=[30], help="the numbers of action-perception cycles")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.01], help="the noise levels of the mazes")
+    parser.add_argument("--epsilon", type=float, nargs="+", default=[0.01], help="the convergence thresholds")
+    parser.add_argument("--window", type=int, nargs="+", default=None, help="the planning windows (receding horizon)")
+    parser.add_argument("--workers", type=int, default=1, help="the number of worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the episodes' random number generators")
+    parser.add_argument("--cache-size", type=int, default=0, help="the size of the posterior cache of each process")
+    parser.add_argument("--stall-steps", type=int, default=None, help="stop an episode after this many idle steps")
+    parser.add_argument("--time-budget", type=float, default=None, help="stop an episode after this many seconds")
+    parser.add_argument("--model-cache", default=None, help="the directory in which compiled models are cached")
+    parser.add_argument("--checkpoint", default=None, help="the file in which finished episodes are saved")
+    parser.add_argument("--store", default="results", help="the directory in which the episodes are stored")
+    parser.add_argument("--output", default="results/results.txt", help="the file in which the results are appended")
+    args = parser.parse_args()
+    if args.registry is not None:
+        names = MazeRegistry.load(args.registry).names
+        args.mazes = names if args.mazes is None else args.mazes
+        for maze in args.mazes:
+            if maze not in names:
+                parser.error("no maze " + maze + " in " + args.registry + ", choose among " + str(names))
+        return args
+    try:
+        args.mazes = Configs.mazes if args.mazes is None else [int(maze) for maze in args.mazes]
+    except ValueError:
+        parser.error("the mazes must be integers when no registry is used")
+    for maze in args.mazes:
+        if maze not in Configs.mazes:
+            parser.error("no configuration for maze " + str(maze) + ", choose among " + str(Configs.mazes))
+    return args
+
+
+if __name__ == '__main__':
+
+    # Create the configurations of all the experiments of the sweep.
+    args = parse_arguments()
+    configs = Configs.grid(
+        args.mazes, args.episodes, args.cycles, args.noise, args.epsilon, args.window, registry=args.registry
+    )
+    stop_conditions = StopConditions(exit_reached=True, stall_steps=args.stall_steps, time_budget=args.time_budget)
+
+    # Run the sweep.
+    time_tracker = TimeTracker()
+    time_tracker.tic()
+    checkpoint = None if args.checkpoint is None else Checkpoint(args.checkpoint)
+    runner = SweepRunner(
+        configs, n_workers=args.workers, seed=args.seed, cache_size=args.cache_size, stop_conditions=stop_conditions,
+        checkpoint=checkpoint, model_cache=args.model_cache
+    )
+    results = runner.run()
+    time_tracker.toc()
+
+    # Store the results of each episode, and write the results in the output file.
+    runner.store(ResultsStore(args.store), results)
+    with open(args.output, "a") as file:
+        runner.print(file, results)
+        time_tracker.print(file)
+        file.write("\n\n")
@@ -0,0 +1,83 @@
+import numpy as np
+from agents.AgentCFE import AgentCFE
+from agents.FixedPointIteration import FixedPointIteration
+from agents.IncrementalInference import IncrementalInference
+from environments.MazeEnv import MazeEnv
+from environments.MazeModel import MazeModel
+
+
+def run_episode(maze, fixed_point, n_steps=10, time_horizon=30):
+    # Return the number of iterations of each inference, the positions of the agent, and the agent
+    env = MazeEnv("./data/mazes/" + str(maze) + ".maze")
+    model = MazeModel(env, sparse=True)
+    rng = np.random.default_rng(0)
+    agent = AgentCFE(env, env.reset(), time_horizon=time_horizon, model=model, rng=rng, fixed_point=fixed_point)
+    positions = []
+    for k in range(n_steps):
+        agent.step(env)
+        positions.append(tuple(env.agent_position()))
+    return agent.iterations, positions, agent
+
+
+def test_posterior_criterion_stops_before_the_cap():
+    iterations, positions, _ = run_episode(1, FixedPointIteration(criterion="posterior"))
+    assert max(iterations) < FixedPointIteration.default_max_iterations
+
+    # The posterior over actions keeps changing on this maze, so the CFE test gives the same trajectory
+    reference_iterations, reference_positions, _ = run_episode(1, FixedPointIteration())
+    assert positions == reference_positions
+    assert sum(iterations) <= 2 * sum(reference_iterations)
+
+
+def test_returned_cfe_is_the_cfe_of_the_final_posterior():
+    env = MazeEnv("./data/mazes/5.maze")
+    for fixed_point in [FixedPointIteration(criterion="posterior"), FixedPointIteration(max_iterations=1)]:
+        agent = AgentCFE(env, env.reset(), time_horizon=10)
+        assert fixed_point.run(agent, env.actions()) == agent.cfe()
+
+
+def test_default_loop_is_the_original_inference_loop():
+    # The loop of AgentCFE.inference before the fixed-point strategies were added
+    def original_inference(agent):
+        cfe = float("inf")
+        while True:
+            agent.update_posterior_over_hidden_states(agent.e[0].size)
+            agent.update_posterior_over_actions(agent.e[0].size, "LinProg")
+            new_cfe = agent.cfe()
+            if cfe - new_cfe < agent.epsilon:
+                break
+            cfe = new_cfe
+
+    env = MazeEnv("./data/mazes/9.maze")
+    agent = AgentCFE(env, env.reset(), time_horizon=10)
+    reference = AgentCFE(env, env.reset(), time_horizon=10)
+    FixedPointIteration().run(agent, env.actions())
+    original_inference(reference)
+    assert np.array_equal(agent.b_hat, reference.b_hat) and np.array_equal(agent.e, reference.e)
+
+
+def test_damping_and_acceleration_keep_the_policy_when_the_iterations_settle():
+    # On 5.maze, the default loop settles and damping or acceleration only change the number of iterations. On
+    # mazes where it does not settle (e.g. 12.maze), they may stop at a different posterior (see FixedPointIteration)
+    _, reference_positions, _ = run_episode(5, FixedPointIteration(), time_horizon=10)
+    for fixed_point in [
+        FixedPointIteration(damping=0.3), FixedPointIteration(acceleration="anderson"),
+        FixedPointIteration(acceleration="aitken")
+    ]:
+        _, positions, agent = run_episode(5, fixed_point, time_horizon=10)
+        assert positions == reference_positions
+        assert np.allclose(agent.b_hat.sum(axis=1), 1) and np.allclose(agent.d_hat.sum(), 1)
+
+
+def test_incremental_inference_records_its_local_updates():
+    env = MazeEnv("./data/mazes/5.maze")
+    incremental = IncrementalInference()
+    agent = AgentCFE(env, env.reset(), time_horizon=10, rng=np.random.default_rng(0), incremental=incremental)
+    for k in range(5):
+        agent.step(env)
+        if k != 0:
+            expected = int(np.ceil(incremental.updates / (agent.T + 1)))
+            if incremental.fallback:
+                expected += agent.fixed_point.iterations
+            assert agent.iterations[-1] == expected
+    assert all(iterations > 0 for iterations in agent.iterations)
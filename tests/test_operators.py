@@ -0,0 +1,107 @@
+import itertools
+import numpy as np
+import pytest
+from operators.Operators import Operators as Ops
+
+
+#
+# The implementation of Operators.multiplication and Operators.average before they were rewritten using broadcasting
+# and einsum, i.e. using expansions, a transposition and one summation per reduced dimension. Note that average
+# modified the caller's list ml.
+#
+class ReferenceOperators:
+
+    @staticmethod
+    def multiplication(x1, x2, ml):
+        # Create the list on non-matching dimensions
+        not_ml = []
+        for i in range(x1.ndim):
+            if ml.count(i) == 0:
+                not_ml.append(i)
+
+        # Sequence of expansions
+        x2_tmp = x2
+        for i in not_ml:
+            x2_tmp = Ops.expansion(x2_tmp, x1.shape[i], x2_tmp.ndim)
+
+        # Permutation
+        pl = [0] * x1.ndim
+        for i in range(x1.ndim):
+            try:
+                pl[i] = ml.index(i)
+            except ValueError:
+                pl[i] = len(ml) + not_ml.index(i)
+        x2_tmp = x2_tmp.transpose(pl)
+
+        # Element-wise multiplication
+        return x2_tmp * x1
+
+    @staticmethod
+    def average(x1, x2, ml, el=None):
+        if el is None:
+            el = []
+
+        # Perform the element-wise multiplication
+        result = ReferenceOperators.multiplication(x1, x2, ml)
+
+        # Create the reduction list, i.e. rl = ml \ el where "\" = set minus
+        rl = ml
+        for elem in el:
+            rl.remove(elem)
+
+        # Sort the reduction list in decreasing order
+        rl.sort(reverse=True)
+
+        # Reduction of the tensor (using a summation) along the dimension of the reduction list
+        for i in rl:
+            result = result.sum(i)
+        return result
+
+
+def combinations(max_ndim=4):
+    # All the (shape of x1, ml, el) such that ml is an ordered list of distinct dimensions of x1, and el a subset of ml
+    for ndim in range(1, max_ndim + 1):
+        shape = tuple(range(2, 2 + ndim))
+        for n in range(1, ndim + 1):
+            for ml in itertools.permutations(range(ndim), n):
+                for k in range(n + 1):
+                    for el in itertools.combinations(ml, k):
+                        yield shape, list(ml), list(el)
+
+
+def create_inputs(shape, ml):
+    rng = np.random.default_rng(0)
+    return rng.random(shape), rng.random([shape[i] for i in ml])
+
+
+@pytest.mark.parametrize("shape, ml", sorted({(shape, tuple(ml)) for shape, ml, _ in combinations()}))
+def test_multiplication(shape, ml):
+    x1, x2 = create_inputs(shape, ml)
+    ml, ml_copy = list(ml), list(ml)
+    expected = ReferenceOperators.multiplication(x1, x2, list(ml))
+    result = Ops.multiplication(x1, x2, ml)
+    assert result.shape == expected.shape
+    np.testing.assert_allclose(result, expected, rtol=1e-12)
+    assert ml == ml_copy
+
+
+@pytest.mark.parametrize("shape, ml, el", list(combinations()))
+def test_average(shape, ml, el):
+    x1, x2 = create_inputs(shape, ml)
+    expected = ReferenceOperators.average(x1, x2, list(ml), list(el))
+    ml_copy, el_copy = list(ml), list(el)
+    result = Ops.average(x1, x2, ml, el)
+    assert np.shape(result) == np.shape(expected)
+    np.testing.assert_allclose(result, expected, rtol=1e-12)
+
+    # The caller's lists are not modified anymore
+    assert ml == ml_copy and el == el_copy
+
+
+@pytest.mark.parametrize("shape, ml", [((2, 3, 4), [2, 0]), ((2, 3, 4, 5), [3, 1, 0])])
+def test_average_without_el(shape, ml):
+    x1, x2 = create_inputs(shape, ml)
+    expected = ReferenceOperators.average(x1, x2, list(ml))
+    ml_copy = list(ml)
+    np.testing.assert_allclose(Ops.average(x1, x2, ml), expected, rtol=1e-12)
+    assert ml == ml_copy